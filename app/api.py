@@ -0,0 +1,475 @@
+import json
+import logging
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qsl, urlsplit
+
+from app.db import ConflictError
+from app.models.changes import tracker
+from app.models.products import Products
+from app.models.records import Record
+from app.models.sales import Sales
+from app.models.suppliers import Suppliers, is_valid_contact
+
+# Requests whose model calls run at once. Each worker thread reads through
+# its own SQLite connection, writes all go through the single writer.
+WORKERS = 8
+
+# Items per page of a list endpoint, unless ?limit= asks for fewer or more
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# How often writes made by other processes, like a GUI terminal, are looked
+# for so the query cache doesn't serve results they changed, in seconds
+CHANGE_POLL_INTERVAL = 0.25
+
+# Largest request body accepted, in bytes
+MAX_BODY_SIZE = 1048576
+
+ROUTES = []  # (method, compiled path pattern, handler)
+
+
+class ApiError(Exception):
+    """Ends a request with an error status and message"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def route(method, pattern):
+    """Register a handler for method and a path regex
+
+    The handler is called with the path's groups, then the query string and
+    the JSON body as dicts, and returns the response payload or a
+    (status, payload) pair.
+    """
+
+    def decorator(handler):
+        ROUTES.append((method, re.compile(f"^{pattern}$"), handler))
+        return handler
+
+    return decorator
+
+
+def to_json(value):
+    """Turn model results into JSON-serialisable values"""
+    if isinstance(value, Record):
+        return value.as_dict()
+    if isinstance(value, sqlite3.Row):
+        return dict(value)
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+
+    return value
+
+
+def int_param(params, name, default=None):
+    """Read an integer from the query string or body"""
+    value = params.get(name, default)
+    if value is None:
+        return None
+
+    # int() would count true as 1 and quietly drop a fraction like 1.9
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer")
+
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer") from None
+
+
+def limit_param(query):
+    """Read ?limit=, kept between 1 and MAX_PAGE_SIZE"""
+    # A negative LIMIT means no limit to SQLite
+    return max(1, min(int_param(query, "limit", PAGE_SIZE), MAX_PAGE_SIZE))
+
+
+def required(body, *names):
+    """Return the given body fields, all of which must be present"""
+    missing = [name for name in names if body.get(name) in (None, "")]
+    if missing:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Missing {', '.join(missing)}")
+
+    return [body[name] for name in names]
+
+
+def page(items, limit, key, order_by=None):
+    """Wrap one page of a keyset paginated list
+
+    A list sorted by another column also returns that column's value in the
+    last row as after_value, to send back with after_id for the next page.
+    """
+    items = to_json(items)
+    if not items or len(items) < limit:
+        return {"items": items, "after_id": None}
+
+    last = items[-1]
+    next_page = {"items": items, "after_id": last[key]}
+    if order_by is not None:
+        # Sales sort by "table.column", rows carry just the column
+        column = order_by.rsplit(".", 1)[-1]
+        if column != key and column in last:
+            next_page["after_value"] = last[column]
+
+    return next_page
+
+
+def list_page(iterate, query, key):
+    """Serve ?after_id=&after_value=&limit=&order_by= from a model's iter_* method"""
+    limit = limit_param(query)
+    order_by = query.get("order_by")
+    kwargs = {"after_value": query.get("after_value")}
+    if order_by is not None:
+        kwargs["order_by"] = order_by
+
+    try:
+        items = list(iterate(int_param(query, "after_id"), limit, **kwargs))
+    except ValueError as e:
+        raise ApiError(HTTPStatus.BAD_REQUEST, str(e)) from None
+
+    return page(items, limit, key, order_by)
+
+
+def found(result, name):
+    """Return result, or a 404 when the model found nothing"""
+    if result is None:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"{name} not found")
+
+    return to_json(result)
+
+
+def saved(result, failure, status=HTTPStatus.OK):
+    """Turn a model write's True/False/None into a response"""
+    if result is None:
+        raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, "Database error, try again")
+    if not result:
+        raise ApiError(HTTPStatus.CONFLICT, failure)
+
+    return status, {"ok": True}
+
+
+# Products
+
+
+@route("GET", "/products")
+def list_products(query, body):
+    if "q" in query:
+        limit = limit_param(query)
+        return {"items": to_json(Products().search(query["q"], limit) or [])}
+
+    return list_page(Products().iter_products, query, "product_id")
+
+
+@route("GET", "/products/low-stock")
+def list_low_stock(query, body):
+    return {"items": found(Products().get_low_stock_products(), "Products")}
+
+
+@route("GET", "/products/value")
+def inventory_value(query, body):
+    products = Products()
+    return {
+        "total_cents": found(products.get_inventory_value(), "Value"),
+        "by_supplier": to_json(products.get_value_by_supplier()),
+    }
+
+
+@route("GET", r"/products/(\d+)")
+def get_product(product_id, query, body):
+    return found(Products().get_product_by_id(int(product_id)), "Product")
+
+
+@route("POST", "/products")
+def add_product(query, body):
+    product_name, supplier = required(body, "product_name", "supplier")
+    price_cents = int_param(body, "price_cents")
+    stock = int_param(body, "stock", 0)
+    if price_cents is None:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Missing price_cents")
+
+    result = Products().add_product(product_name, price_cents, stock, supplier)
+    return saved(result, "Product already exists or unknown supplier", 201)
+
+
+@route("PUT", r"/products/(\d+)")
+def edit_product(product_id, query, body):
+    product_name, supplier = required(body, "product_name", "supplier")
+    price_cents = int_param(body, "price_cents")
+    stock = int_param(body, "stock")
+    if price_cents is None or stock is None:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Missing price_cents or stock")
+
+    try:
+        result = Products().edit_product(
+            int(product_id),
+            product_name,
+            price_cents,
+            stock,
+            supplier,
+            int_param(body, "row_version"),
+        )
+    except ConflictError as e:
+        raise ApiError(HTTPStatus.CONFLICT, str(e)) from None
+
+    return saved(result, "Product not found or name already in use")
+
+
+@route("POST", r"/products/(\d+)/stock")
+def adjust_stock(product_id, query, body):
+    change = int_param(body, "change")
+    if change is None:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Missing change")
+
+    result = Products().adjust_stock(int(product_id), change)
+    return saved(result, "Product not found or not enough stock")
+
+
+@route("DELETE", r"/products/(\d+)")
+def delete_product(product_id, query, body):
+    result = Products().delete_product(int(product_id))
+    return saved(result, "Product not found or has sales on record")
+
+
+# Suppliers
+
+
+@route("GET", "/suppliers")
+def list_suppliers(query, body):
+    if "q" in query:
+        limit = limit_param(query)
+        return {"items": to_json(Suppliers().search(query["q"], limit) or [])}
+
+    return list_page(Suppliers().iter_suppliers, query, "supplier_id")
+
+
+@route("GET", r"/suppliers/(\d+)")
+def get_supplier(supplier_id, query, body):
+    return found(Suppliers().get_supplier_by_id(int(supplier_id)), "Supplier")
+
+
+def supplier_fields(body):
+    """Return the validated supplier fields of a request body"""
+    fields = required(body, "company_name", "supplier_name", "email", "phone")
+    if not is_valid_contact(fields[2], fields[3]):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Invalid email or phone")
+
+    return fields
+
+
+@route("POST", "/suppliers")
+def add_supplier(query, body):
+    result = Suppliers().add_supplier(*supplier_fields(body))
+    return saved(result, "Supplier already exists", 201)
+
+
+@route("PUT", r"/suppliers/(\d+)")
+def edit_supplier(supplier_id, query, body):
+    result = Suppliers().edit_supplier(int(supplier_id), *supplier_fields(body))
+    return saved(result, "Supplier details already in use")
+
+
+@route("DELETE", r"/suppliers/(\d+)")
+def delete_supplier(supplier_id, query, body):
+    return saved(Suppliers().delete_supplier(int(supplier_id)), "Supplier not found")
+
+
+# Sales
+
+
+@route("GET", "/sales")
+def list_sales(query, body):
+    return list_page(Sales().iter_sales, query, "sale_id")
+
+
+@route("POST", "/sales")
+def record_sales(query, body):
+    """Record one sale, or a whole basket of "lines" in one transaction"""
+    lines = body.get("lines")
+    if lines is None:
+        lines = [body]
+    if not isinstance(lines, list) or not lines:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "lines must be a non-empty list")
+    if not all(isinstance(line, dict) for line in lines):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Every line must be a JSON object")
+
+    lines = [
+        (
+            int_param(line, "product_id"),
+            int_param(line, "quantity"),
+            int_param(line, "unit_price_cents"),
+        )
+        for line in lines
+    ]
+    if any(None in line[:2] for line in lines):
+        raise ApiError(
+            HTTPStatus.BAD_REQUEST, "Every line needs product_id and quantity"
+        )
+
+    sale_ids = Sales().record_sales(lines)
+    if sale_ids is None:
+        raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, "Database error, try again")
+
+    # Lines without enough stock are skipped and come back as null
+    status = HTTPStatus.CREATED if any(sale_ids) else HTTPStatus.CONFLICT
+    return status, {"sale_ids": sale_ids}
+
+
+@route("GET", "/sales/daily")
+def daily_sales(query, body):
+    rows = Sales().get_daily_sales(
+        *required(query, "start", "end"), int_param(query, "product_id")
+    )
+    return {"items": found(rows, "Sales")}
+
+
+@route("GET", "/sales/weekly")
+def weekly_sales(query, body):
+    rows = Sales().get_weekly_supplier_sales(
+        *required(query, "start", "end"), int_param(query, "supplier_id")
+    )
+    return {"items": found(rows, "Sales")}
+
+
+@route("GET", "/sales/totals")
+def sales_totals(query, body):
+    rows = Sales().get_product_sales_totals(*required(query, "start", "end"))
+    return {"items": found(rows, "Sales")}
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """Dispatch JSON requests to the route handlers"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, registers send many requests
+    timeout = 30  # closes idle keep-alive connections
+    disable_nagle_algorithm = True  # headers and body are written separately
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PUT(self):
+        self.dispatch("PUT")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    def dispatch(self, method):
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/") or "/"
+
+        try:
+            # The body is always read so the connection can be reused
+            body = self.read_body()
+
+            allowed = False
+            for route_method, pattern, handler in ROUTES:
+                match = pattern.match(path)
+                if match is None:
+                    continue
+                if route_method != method:
+                    allowed = True
+                    continue
+
+                result = self.server.executor.submit(
+                    handler, *match.groups(), dict(parse_qsl(url.query)), body
+                ).result()
+                break
+            else:
+                if allowed:
+                    raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, "Method not allowed")
+                raise ApiError(HTTPStatus.NOT_FOUND, "Not found")
+
+            status, payload = (
+                result if isinstance(result, tuple) else (HTTPStatus.OK, result)
+            )
+        except ApiError as e:
+            status, payload = e.status, {"error": str(e)}
+        except Exception as e:
+            logging.error(f"Error: {e}")
+            status = HTTPStatus.INTERNAL_SERVER_ERROR
+            payload = {"error": "Server error"}
+
+        self.send_json(status, payload)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_SIZE:
+            self.close_connection = True
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Body too large")
+        if not length:
+            return {}
+
+        try:
+            body = json.loads(self.rfile.read(length))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Body must be JSON") from None
+
+        if not isinstance(body, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+
+        return body
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logging.info(f"{self.address_string()} {format % args}")
+
+
+class PooledHTTPServer(ThreadingMixIn, HTTPServer):
+    """HTTPServer that runs the model calls on a fixed pool of worker threads
+
+    Every connection gets a thread of its own that only parses requests and
+    writes responses, so idle keep-alive registers don't hold up anyone.
+    The handlers run on the pool, which keeps the number of SQLite
+    connections bounded however many registers connect.
+    """
+
+    request_queue_size = 128  # connections waiting to be accepted
+    daemon_threads = True
+    block_on_close = False  # don't wait for idle keep-alive connections
+
+    def __init__(self, address, handler=ApiHandler, workers=WORKERS):
+        super().__init__(address, handler)
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="api-worker"
+        )
+        self.stopped = threading.Event()
+        self.change_poller = threading.Thread(
+            target=self.poll_changes, name="api-changes", daemon=True
+        )
+        self.change_poller.start()
+
+    def poll_changes(self):
+        """Drop cached results that other processes' writes made stale"""
+        while not self.stopped.wait(CHANGE_POLL_INTERVAL):
+            tracker.poll()
+
+    def server_close(self):
+        super().server_close()
+        self.stopped.set()
+        self.executor.shutdown(wait=True)
+
+
+def serve(host="127.0.0.1", port=8080, workers=WORKERS):
+    """Serve the JSON API until interrupted"""
+    with PooledHTTPServer((host, port), workers=workers) as server:
+        logging.info(f"Serving on http://{host}:{server.server_port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -1,18 +1,50 @@
-import os
+import importlib
 
 import customtkinter
-from PIL import Image
 
-from app.frames.alerts import AlertsFrame
-from app.frames.inventory import InventoryFrame
-from app.frames.sales import SalesFrame
-from app.frames.suppliers import SuppliersFrame
+from app import startup
+from app.icons import load_icon
 
+# Frame modules are only imported when their tab is first built
+FRAME_CLASSES = {
+    "inventory": ("app.frames.inventory", "InventoryFrame"),
+    "suppliers": ("app.frames.suppliers", "SuppliersFrame"),
+    "sales": ("app.frames.sales", "SalesFrame"),
+    "alerts": ("app.frames.alerts", "AlertsFrame"),
+}
 
-class AppTop(customtkinter.CTk):
+# How long after startup to start building the tabs that aren't shown yet
+PREFETCH_DELAY_MS = 300
+
+
+class LazyFramesMixin:
+    """Build the content frames on first use instead of all up front"""
+
+    def get_frame(self, name):
+        """Return the frame called name, building (and loading) it if needed"""
+        frame = self.frames.get(name)
+        if frame is None:
+            module_name, class_name = FRAME_CLASSES[name]
+            frame_class = getattr(importlib.import_module(module_name), class_name)
+            frame = frame_class(self, corner_radius=0, fg_color="transparent")
+            self.frames[name] = frame
+
+        return frame
+
+    def _prefetch_frames(self):
+        # One frame per pass so the window keeps handling events in between
+        for name in FRAME_CLASSES:
+            if name not in self.frames:
+                self.get_frame(name)
+                self.after_idle(self._prefetch_frames)
+                return
+
+
+class AppTop(LazyFramesMixin, customtkinter.CTk):
     # Tita 1
-    def __init__(self):
+    def __init__(self, prefetch=True):
         super().__init__()
+        startup.mark("window")
 
         # Theme configuration
 
@@ -25,47 +57,38 @@ class AppTop(customtkinter.CTk):
 
         # load images
         self._load_images()
+        startup.mark("image load")
 
         # create navigation frame
         self._create_navigation_frame()
 
-        # Create content frames
-        self.inventory_frame = InventoryFrame(
-            self, corner_radius=0, fg_color="transparent"
-        )
-
-        self.suppliers_frame = SuppliersFrame(
-            self, corner_radius=0, fg_color="transparent"
-        )
-
-        self.sales_frame = SalesFrame(self, corner_radius=0, fg_color="transparent")
-
-        self.alerts_frame = AlertsFrame(self, corner_radius=0, fg_color="transparent")
+        # Content frames are built the first time they are shown
+        self.frames = {}
+        if prefetch:
+            self.after(PREFETCH_DELAY_MS, self._prefetch_frames)
 
         # Select default frame
         self.select_frame_by_name("inventory")
+        startup.mark("frame build")
 
     def _load_images(self):
-        image_path = os.path.join(
-            os.path.dirname(os.path.realpath(__file__)), "test_images"
-        )
         self.logo_image = customtkinter.CTkImage(
-            Image.open(os.path.join(image_path, "CustomTkinter_logo_single.png")),
+            load_icon("CustomTkinter_logo_single.png", (26, 26)),
             size=(26, 26),
         )
         self.inventory_image = customtkinter.CTkImage(
-            dark_image=Image.open(os.path.join(image_path, "home_light.png")),
+            dark_image=load_icon("home_light.png", (20, 20)),
             size=(20, 20),
         )
         self.suppliers_image = customtkinter.CTkImage(
-            Image.open(os.path.join(image_path, "image_icon_light.png")), size=(20, 20)
+            load_icon("image_icon_light.png", (20, 20)), size=(20, 20)
         )
         self.sales_image = customtkinter.CTkImage(
-            dark_image=Image.open(os.path.join(image_path, "chat_light.png")),
+            dark_image=load_icon("chat_light.png", (20, 20)),
             size=(20, 20),
         )
         self.alerts_image = customtkinter.CTkImage(
-            dark_image=Image.open(os.path.join(image_path, "add_user_light.png")),
+            dark_image=load_icon("add_user_light.png", (20, 20)),
             size=(20, 20),
         )
 
@@ -162,14 +185,9 @@ class AppTop(customtkinter.CTk):
         )
 
         # Show selected frame
-        frames = {
-            "inventory": self.inventory_frame,
-            "suppliers": self.suppliers_frame,
-            "sales": self.sales_frame,
-            "alerts": self.alerts_frame,
-        }
-
-        for frame_name, frame in frames.items():
+        self.get_frame(name)
+
+        for frame_name, frame in self.frames.items():
             if name == frame_name:
                 frame.grid(
                     row=1, column=0, sticky="nsew"
@@ -190,9 +208,10 @@ class AppTop(customtkinter.CTk):
         self.select_frame_by_name("alerts")
 
 
-class AppRight(customtkinter.CTk):
-    def __init__(self):
+class AppRight(LazyFramesMixin, customtkinter.CTk):
+    def __init__(self, prefetch=True):
         super().__init__()
+        startup.mark("window")
 
         self.title("Skibidi Inventory Management")
         self.geometry("700x450")
@@ -204,47 +223,38 @@ class AppRight(customtkinter.CTk):
 
         # load images
         self._load_images()
+        startup.mark("image load")
 
         # create navigation frame
         self._create_navigation_frame()
 
-        # Create content frames
-        self.inventory_frame = InventoryFrame(
-            self, corner_radius=0, fg_color="transparent"
-        )
-
-        self.suppliers_frame = SuppliersFrame(
-            self, corner_radius=0, fg_color="transparent"
-        )
-
-        self.sales_frame = SalesFrame(self, corner_radius=0, fg_color="transparent")
-
-        self.alerts_frame = AlertsFrame(self, corner_radius=0, fg_color="transparent")
+        # Content frames are built the first time they are shown
+        self.frames = {}
+        if prefetch:
+            self.after(PREFETCH_DELAY_MS, self._prefetch_frames)
 
         # Select default frame
         self.select_frame_by_name("inventory")
+        startup.mark("frame build")
 
     def _load_images(self):
-        image_path = os.path.join(
-            os.path.dirname(os.path.realpath(__file__)), "test_images"
-        )
         self.logo_image = customtkinter.CTkImage(
-            Image.open(os.path.join(image_path, "CustomTkinter_logo_single.png")),
+            load_icon("CustomTkinter_logo_single.png", (26, 26)),
             size=(26, 26),
         )
         self.inventory_image = customtkinter.CTkImage(
-            dark_image=Image.open(os.path.join(image_path, "home_light.png")),
+            dark_image=load_icon("home_light.png", (20, 20)),
             size=(20, 20),
         )
         self.suppliers_image = customtkinter.CTkImage(
-            Image.open(os.path.join(image_path, "image_icon_light.png")), size=(20, 20)
+            load_icon("image_icon_light.png", (20, 20)), size=(20, 20)
         )
         self.sales_image = customtkinter.CTkImage(
-            dark_image=Image.open(os.path.join(image_path, "chat_light.png")),
+            dark_image=load_icon("chat_light.png", (20, 20)),
             size=(20, 20),
         )
         self.alerts_image = customtkinter.CTkImage(
-            dark_image=Image.open(os.path.join(image_path, "add_user_light.png")),
+            dark_image=load_icon("add_user_light.png", (20, 20)),
             size=(20, 20),
         )
 
@@ -337,14 +347,9 @@ class AppRight(customtkinter.CTk):
         )
 
         # show selected frame
-        frames = {
-            "inventory": self.inventory_frame,
-            "suppliers": self.suppliers_frame,
-            "sales": self.sales_frame,
-            "alerts": self.alerts_frame,
-        }
-
-        for frame_name, frame in frames.items():
+        self.get_frame(name)
+
+        for frame_name, frame in self.frames.items():
             if name == frame_name:
                 frame.grid(row=0, column=0, sticky="nsew")
             else:
@@ -363,10 +368,11 @@ class AppRight(customtkinter.CTk):
         self.select_frame_by_name("alerts")
 
 
-class AppLeft(customtkinter.CTk):
+class AppLeft(LazyFramesMixin, customtkinter.CTk):
     # Tita 2
-    def __init__(self):
+    def __init__(self, prefetch=True):
         super().__init__()
+        startup.mark("window")
 
         self.title("Skibidi Inventory Management")
         self.geometry("700x450")
@@ -377,47 +383,38 @@ class AppLeft(customtkinter.CTk):
 
         # load images
         self._load_images()
+        startup.mark("image load")
 
         # create navigation frame
         self._create_navigation_frame()
 
-        # Create content frames
-        self.inventory_frame = InventoryFrame(
-            self, corner_radius=0, fg_color="transparent"
-        )
-
-        self.suppliers_frame = SuppliersFrame(
-            self, corner_radius=0, fg_color="transparent"
-        )
-
-        self.sales_frame = SalesFrame(self, corner_radius=0, fg_color="transparent")
-
-        self.alerts_frame = AlertsFrame(self, corner_radius=0, fg_color="transparent")
+        # Content frames are built the first time they are shown
+        self.frames = {}
+        if prefetch:
+            self.after(PREFETCH_DELAY_MS, self._prefetch_frames)
 
         # Select default frame
         self.select_frame_by_name("inventory")
+        startup.mark("frame build")
 
     def _load_images(self):
-        image_path = os.path.join(
-            os.path.dirname(os.path.realpath(__file__)), "test_images"
-        )
         self.logo_image = customtkinter.CTkImage(
-            Image.open(os.path.join(image_path, "CustomTkinter_logo_single.png")),
+            load_icon("CustomTkinter_logo_single.png", (26, 26)),
             size=(26, 26),
         )
         self.inventory_image = customtkinter.CTkImage(
-            dark_image=Image.open(os.path.join(image_path, "home_light.png")),
+            dark_image=load_icon("home_light.png", (20, 20)),
             size=(20, 20),
         )
         self.suppliers_image = customtkinter.CTkImage(
-            Image.open(os.path.join(image_path, "image_icon_light.png")), size=(20, 20)
+            load_icon("image_icon_light.png", (20, 20)), size=(20, 20)
         )
         self.sales_image = customtkinter.CTkImage(
-            dark_image=Image.open(os.path.join(image_path, "chat_light.png")),
+            dark_image=load_icon("chat_light.png", (20, 20)),
             size=(20, 20),
         )
         self.alerts_image = customtkinter.CTkImage(
-            dark_image=Image.open(os.path.join(image_path, "add_user_light.png")),
+            dark_image=load_icon("add_user_light.png", (20, 20)),
             size=(20, 20),
         )
 
@@ -510,14 +507,9 @@ class AppLeft(customtkinter.CTk):
         )
 
         # show selected frame
-        frames = {
-            "inventory": self.inventory_frame,
-            "suppliers": self.suppliers_frame,
-            "sales": self.sales_frame,
-            "alerts": self.alerts_frame,
-        }
-
-        for frame_name, frame in frames.items():
+        self.get_frame(name)
+
+        for frame_name, frame in self.frames.items():
             if name == frame_name:
                 frame.grid(row=0, column=1, sticky="nsew")
             else:
@@ -0,0 +1,326 @@
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+
+from app.db import init_db, optimize, transaction
+from app.models.products import Products
+from app.models.sales import Sales
+from app.models.suppliers import Suppliers
+from app.money import format_money
+
+# Nothing here may import the frames or customtkinter, so scheduled jobs
+# start quickly and run on servers without a display.
+
+
+def report_errors(errors):
+    for line, reason in errors:
+        where = f"line {line}" if line is not None else "import"
+        print(f"{where}: {reason}", file=sys.stderr)
+
+
+def read_rows(path, *fields):
+    """Yield (line, values) for every CSV row, values converted to int"""
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        # Line 1 is the header
+        for line, record in enumerate(csv.DictReader(file), 2):
+            try:
+                yield line, tuple(int(record.get(field) or "") for field in fields)
+            except ValueError:
+                yield line, None
+
+
+def import_products(args):
+    imported, errors = Products().import_products_csv(args.path)
+    report_errors(errors)
+    print(f"Imported {imported} products, skipped {len(errors)}")
+    return 1 if errors else 0
+
+
+def import_suppliers(args):
+    report = Suppliers().upsert_suppliers_csv(args.path)
+
+    counts = {"inserted": 0, "updated": 0, "rejected": 0}
+    for line, status, reason in report:
+        counts[status] += 1
+        if status == "rejected":
+            report_errors([(line, reason)])
+
+    print(
+        f"Inserted {counts['inserted']}, updated {counts['updated']},"
+        f" rejected {counts['rejected']} suppliers"
+    )
+    return 1 if counts["rejected"] else 0
+
+
+def stock_count(args):
+    products = Products()
+    counted, errors = 0, []
+
+    # All or nothing, a count that fails half way leaves the stock untouched
+    with transaction() as tx:
+        for line, row in read_rows(args.path, "product_id", "stock"):
+            if row is None or row[1] < 0:
+                errors.append((line, "Invalid product_id or stock value"))
+            elif products.set_stock(*row, tx=tx):
+                counted += 1
+            else:
+                errors.append((line, f"Unknown product: {row[0]}"))
+
+        if errors and not args.partial:
+            report_errors(errors)
+            print("Stock count not applied, fix the rows above or pass --partial")
+            tx.rollback()
+            return 1
+
+    report_errors(errors)
+    print(f"Updated stock of {counted} products, skipped {len(errors)}")
+    return 1 if errors else 0
+
+
+def record_sales(args):
+    lines = []
+    errors = []
+    for line, row in read_rows(args.path, "product_id", "quantity"):
+        if row is None or row[1] <= 0:
+            errors.append((line, "Invalid product_id or quantity"))
+        else:
+            lines.append((line, row))
+
+    # One transaction and one commit for the whole file
+    sale_ids = Sales().record_sales([row for _, row in lines])
+    if sale_ids is None:
+        print("Database error, no sales recorded", file=sys.stderr)
+        return 1
+
+    errors.extend(
+        (line, f"Not enough stock for product {row[0]}")
+        for (line, row), sale_id in zip(lines, sale_ids)
+        if sale_id is None
+    )
+    errors.sort()
+    report_errors(errors)
+    recorded = len(sale_ids) - sum(sale_id is None for sale_id in sale_ids)
+    print(f"Recorded {recorded} sales, skipped {len(errors)}")
+    return 1 if errors else 0
+
+
+def export_products(args):
+    writer = csv.writer(sys.stdout)
+    writer.writerow(("product_id", "product_name", "price", "stock", "supplier"))
+
+    # Streamed, so the whole inventory is never held in memory
+    for product in Products().iter_products(order_by=args.order_by):
+        writer.writerow(
+            (
+                product.product_id,
+                product.product_name,
+                format_money(product.price_cents, ""),
+                product.stock,
+                product.supplier_name,
+            )
+        )
+    return 0
+
+
+def export_sales(args):
+    writer = csv.writer(sys.stdout)
+    writer.writerow(("sale_id", "product_name", "quantity", "supplier"))
+
+    for sale in Sales().iter_sales():
+        writer.writerow(
+            (sale.sale_id, sale.product_name, sale.quantity, sale.supplier_name)
+        )
+    return 0
+
+
+def low_stock(args):
+    products = Products().get_low_stock_products()
+    if products is None:
+        return 1
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(
+        ("product_id", "product_name", "stock", "reorder_level", "severity")
+    )
+    for product in products:
+        writer.writerow(
+            (
+                product.product_id,
+                product.product_name,
+                product.stock,
+                product.reorder_level,
+                product.severity,
+            )
+        )
+    return 0
+
+
+def valuation(args):
+    products = Products()
+    total = products.get_inventory_value()
+    suppliers = products.get_value_by_supplier()
+    if total is None or suppliers is None:
+        return 1
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(("supplier", "products", "stock", "value"))
+    for row in suppliers:
+        writer.writerow(
+            (
+                row["company_name"],
+                row["product_count"],
+                row["stock"],
+                format_money(row["total_cents"], ""),
+            )
+        )
+    writer.writerow(("Total", "", "", format_money(total, "")))
+    return 0
+
+
+def sales_report(args):
+    sales = Sales()
+    writer = csv.writer(sys.stdout)
+
+    if args.daily:
+        rows = sales.get_daily_sales(args.start, args.end)
+        if rows is None:
+            return 1
+
+        writer.writerow(("day", "product_id", "product_name", "quantity", "revenue"))
+        for row in rows:
+            writer.writerow(
+                (
+                    row["sale_day"],
+                    row["product_id"],
+                    row["product_name"],
+                    row["quantity"],
+                    format_money(row["revenue_cents"], ""),
+                )
+            )
+        return 0
+
+    rows = sales.get_product_sales_totals(args.start, args.end)
+    if rows is None:
+        return 1
+
+    writer.writerow(("product_id", "product_name", "quantity", "revenue"))
+    for row in rows:
+        writer.writerow(
+            (
+                row["product_id"],
+                row["product_name"],
+                row["quantity"],
+                format_money(row["revenue_cents"], ""),
+            )
+        )
+    return 0
+
+
+def maintain(args):
+    busy, log_pages, checkpointed = optimize(vacuum=args.vacuum)
+    print(f"Checkpointed {checkpointed} of {log_pages} WAL pages")
+    return 1 if busy else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.cli", description="Inventory batch operations"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_products_parser = subparsers.add_parser(
+        "import-products",
+        help="import products from a CSV with product_name, price, stock, supplier and optional reorder_level columns",
+    )
+    import_products_parser.add_argument("path", help="CSV file to import")
+    import_products_parser.set_defaults(handler=import_products)
+
+    import_suppliers_parser = subparsers.add_parser(
+        "import-suppliers",
+        help="insert or update suppliers from a CSV with company_name, supplier_name, email and phone columns",
+    )
+    import_suppliers_parser.add_argument("path", help="CSV file to import")
+    import_suppliers_parser.set_defaults(handler=import_suppliers)
+
+    stock_count_parser = subparsers.add_parser(
+        "stock-count",
+        help="set stock to counted values from a CSV with product_id and stock columns, in one transaction",
+    )
+    stock_count_parser.add_argument("path", help="CSV file with the count")
+    stock_count_parser.add_argument(
+        "--partial",
+        action="store_true",
+        help="apply the valid rows even if some are rejected",
+    )
+    stock_count_parser.set_defaults(handler=stock_count)
+
+    record_sales_parser = subparsers.add_parser(
+        "record-sales",
+        help="record sales from a CSV with product_id and quantity columns, in one transaction",
+    )
+    record_sales_parser.add_argument("path", help="CSV file with the sales")
+    record_sales_parser.set_defaults(handler=record_sales)
+
+    export_products_parser = subparsers.add_parser(
+        "export-products", help="write every product to stdout as CSV"
+    )
+    export_products_parser.add_argument(
+        "--order-by",
+        default="product_id",
+        choices=Products.ORDER_KEYS,
+        help="column to sort by",
+    )
+    export_products_parser.set_defaults(handler=export_products)
+
+    export_sales_parser = subparsers.add_parser(
+        "export-sales", help="write every sale to stdout as CSV"
+    )
+    export_sales_parser.set_defaults(handler=export_sales)
+
+    low_stock_parser = subparsers.add_parser(
+        "low-stock", help="write products that need restocking to stdout as CSV"
+    )
+    low_stock_parser.set_defaults(handler=low_stock)
+
+    valuation_parser = subparsers.add_parser(
+        "valuation", help="write the stock value per supplier to stdout as CSV"
+    )
+    valuation_parser.set_defaults(handler=valuation)
+
+    sales_report_parser = subparsers.add_parser(
+        "sales-report", help="write sales per product between two dates as CSV"
+    )
+    sales_report_parser.add_argument("start", help="first day, YYYY-MM-DD")
+    sales_report_parser.add_argument("end", help="last day, YYYY-MM-DD")
+    sales_report_parser.add_argument(
+        "--daily", action="store_true", help="one row per product and day"
+    )
+    sales_report_parser.set_defaults(handler=sales_report)
+
+    maintain_parser = subparsers.add_parser(
+        "maintain",
+        help="refresh query statistics and checkpoint the WAL, for nightly jobs",
+    )
+    maintain_parser.add_argument(
+        "--vacuum", action="store_true", help="also rebuild the file to reclaim space"
+    )
+    maintain_parser.set_defaults(handler=maintain)
+
+    args = parser.parse_args(argv)
+
+    try:
+        init_db()
+        return args.handler(args)
+    except BrokenPipeError:
+        # The reader stopped early, e.g. head; also quiets the final flush
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except (OSError, UnicodeDecodeError, csv.Error, sqlite3.DatabaseError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
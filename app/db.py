@@ -1,18 +1,281 @@
+import atexit
+import logging
 import os
+import random
+import re
 import sqlite3
+import threading
+import time
 
+DATABASE_PATH = "./app/database.db"
+SCHEMA_PATH = "./app/schema.sql"
+MIGRATIONS_PATH = "./app/migrations"
 
-def get_db_connection():
-    conn = sqlite3.connect("./app/database.db")
+# Rows pulled per fetchmany() call when streaming a query
+FETCH_BATCH_SIZE = 500
+
+# Rows written per executemany() call by the bulk imports
+IMPORT_BATCH_SIZE = 1000
+
+# Largest value an INTEGER column holds, a signed 64-bit integer
+MAX_INTEGER = 2**63 - 1
+
+# The oldest SQLite the migrations run on, 0008 uses ALTER TABLE DROP COLUMN
+MIN_SQLITE_VERSION = (3, 35, 0)
+
+# Applied once when a connection is opened, not on every query
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -16000),  # negative means KiB, so roughly 16 MB of page cache
+    ("mmap_size", 134217728),  # 128 MB
+    ("temp_store", "MEMORY"),
+)
+
+# How long SQLite itself waits for another terminal to release the write
+# lock, in milliseconds. Set INVENTORY_BUSY_TIMEOUT_MS to change it.
+BUSY_TIMEOUT_MS = int(os.environ.get("INVENTORY_BUSY_TIMEOUT_MS", "5000"))
+
+# After that, how many more times a write tries to take the lock and the
+# longest delay before the first retry in seconds, doubled on every retry
+BUSY_RETRIES = 3
+BUSY_RETRY_DELAY = 0.1
+
+# sqlite3 connections can't be shared across threads, so each thread that
+# touches the database keeps its own long-lived connection here
+_local = threading.local()
+
+
+def open_connection(factory=sqlite3.Connection):
+    """Open a new connection with the app's PRAGMAs, outside the per-thread ones"""
+    conn = sqlite3.connect(DATABASE_PATH, factory=factory)
     conn.row_factory = sqlite3.Row
+
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name} = {value}")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+
+    return conn
+
+
+def get_db_connection(factory=sqlite3.Connection):
+    """Return the calling thread's connection, opening it on first use"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = open_connection(factory)
+        _local.conn = conn
+
     return conn
 
 
+def close_db_connection():
+    """Close the calling thread's connection if it has one"""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+atexit.register(close_db_connection)
+
+
+def iter_query(query, params=(), batch_size=FETCH_BATCH_SIZE, row_factory=None):
+    """Yield the rows of a query, fetching batch_size rows at a time"""
+    cursor = get_db_connection().cursor()
+    if row_factory is not None:
+        cursor.row_factory = row_factory
+
+    try:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+
+            yield from rows
+    finally:
+        cursor.close()
+
+
+class ConflictError(Exception):
+    """A row changed since it was read, so it wasn't overwritten"""
+
+
+def is_busy(error):
+    """Whether a database error means another connection holds the lock"""
+    return isinstance(error, sqlite3.OperationalError) and (
+        "locked" in str(error) or "busy" in str(error)
+    )
+
+
+def retry_busy(func, *args, retries=None, delay=None):
+    """Call func(*args), retrying with jittered backoff while the database is locked"""
+    retries = BUSY_RETRIES if retries is None else retries
+    delay = BUSY_RETRY_DELAY if delay is None else delay
+
+    for attempt in range(retries + 1):
+        try:
+            return func(*args)
+        except sqlite3.OperationalError as e:
+            if attempt == retries or not is_busy(e):
+                raise
+
+            # A random delay keeps terminals that collided from retrying in
+            # step and colliding again
+            logging.warning(f"Database busy, retrying: {e}")
+            time.sleep(random.uniform(0, delay * 2**attempt))
+
+
+def transaction():
+    """Group model writes into one unit of work with a single commit
+
+        with transaction() as tx:
+            Products().adjust_stock(product_id, 20, tx=tx)
+            Sales().record_sale(product_id, 1, tx=tx)
+
+    The writes commit together when the block ends, or are all rolled back
+    if it raises. A transaction() opened inside another becomes a savepoint
+    of the outer one.
+    """
+    # Imported here since the writer is built on this module
+    from app.writer import writer
+
+    return writer.transaction()
+
+
+def keyset_query(
+    columns, source, key, order_by, after_id=None, limit=None, after_value=None
+):
+    """Build a SELECT ordered by (order_by, key) that resumes after a row
+
+    Keyset pagination seeks straight to the row after after_id through the
+    index instead of skipping over every earlier row like OFFSET does. When
+    sorting by another column the cursor is (after_value, after_id), the
+    last row's sort value and ID; without after_value it is read from the
+    after_id row, which raises ValueError if that row has been deleted.
+    """
+    query = f"SELECT {columns} FROM {source}"
+    params = []
+
+    if after_id is not None:
+        if order_by == key:
+            query += f" WHERE {key} > ?"
+            params.append(after_id)
+        else:
+            if after_value is None:
+                after_value = keyset_anchor(source, key, order_by, after_id)
+            query += f" WHERE ({order_by}, {key}) > (?, ?)"
+            params.extend((after_value, after_id))
+
+    if order_by == key:
+        query += f" ORDER BY {key}"
+    else:
+        query += f" ORDER BY {order_by}, {key}"
+
+    query += " LIMIT ?"
+    params.append(-1 if limit is None else limit)
+
+    return query, params
+
+
+def keyset_anchor(source, key, order_by, after_id):
+    """Return the order_by value of the row a keyset page resumes after"""
+    query = f"SELECT {order_by} FROM {source} WHERE {key} = ?"
+    row = get_db_connection().execute(query, (after_id,)).fetchone()
+
+    # Looking past a deleted row would otherwise compare against NULL and
+    # quietly end the list
+    if row is None:
+        raise ValueError(f"Cannot resume after {after_id}, it no longer exists")
+
+    return row[0]
+
+
+def fts_query(term):
+    """Turn search box text into an FTS5 query matching every word as a prefix"""
+    words = re.findall(r"\w+", term)
+    if not words:
+        return None
+
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def _load_migrations():
+    """Return (version, path) for every migration file, oldest first"""
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_PATH):
+        if filename.endswith(".sql"):
+            version = int(filename.split("_", 1)[0])
+            migrations.append((version, os.path.join(MIGRATIONS_PATH, filename)))
+
+    return sorted(migrations)
+
+
+def _split_statements(script):
+    """Split a SQL script into statements, keeping trigger bodies intact"""
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            yield statement
+            statement = ""
+
+    if statement.strip():
+        yield statement
+
+
+def migrate(conn):
+    """Bring the database up to the newest migration, tracked in user_version"""
+    # Take the write lock before reading the version so two terminals
+    # starting at once can't both apply the same migration
+    retry_busy(conn.execute, "BEGIN IMMEDIATE")
+    try:
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+
+        for version, path in _load_migrations():
+            if version <= current:
+                continue
+
+            with open(path) as file:
+                for statement in _split_statements(file.read()):
+                    conn.execute(statement)
+
+            conn.execute(f"PRAGMA user_version = {version}")
+            logging.info(f"Applied migration {os.path.basename(path)}")
+
+        conn.commit()
+    except sqlite3.DatabaseError:
+        conn.rollback()
+        raise
+
+
+def optimize(vacuum=False):
+    """Tidy the database file up, for scheduled maintenance
+
+    Refreshes the query planner's statistics, optionally rebuilds the file
+    to reclaim the space of deleted rows, and folds the WAL back into the
+    database. Returns the checkpoint's (busy, log pages, checkpointed pages).
+    """
+    conn = get_db_connection()
+    retry_busy(conn.execute, "PRAGMA optimize")
+    if vacuum:
+        retry_busy(conn.execute, "VACUUM")
+
+    return tuple(retry_busy(conn.execute, "PRAGMA wal_checkpoint(TRUNCATE)").fetchone())
+
+
 def init_db():
-    if os.path.exists("./app/database.db"):
-        return
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        required = ".".join(str(part) for part in MIN_SQLITE_VERSION)
+        raise sqlite3.NotSupportedError(
+            f"SQLite {sqlite3.sqlite_version} is too old, {required} or newer is needed"
+        )
 
-    with get_db_connection() as conn:
-        with open("./app/schema.sql") as file:
+    conn = get_db_connection()
+
+    if conn.execute("PRAGMA user_version").fetchone()[0] == 0:
+        with open(SCHEMA_PATH) as file:
             conn.executescript(file.read())
             conn.commit()
+
+    migrate(conn)
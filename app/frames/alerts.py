@@ -3,9 +3,19 @@ from tkinter import ttk
 import customtkinter
 from customtkinter import CTkButton, CTkEntry, CTkFrame, CTkLabel, CTkOptionMenu
 
+from app.frames.loader import DataLoader
+from app.frames.search import SearchController
 from app.frames.style import configure_treeview_style
+from app.frames.virtual_tree import ListSource, QuerySource, VirtualTree
+from app.frames.watcher import ChangeWatcher
 from app.models.products import Products
 
+SEVERITY_LABELS = {
+    "out": "Out of Stock",
+    "critical": "Critical",
+    "low": "Low Stock",
+}
+
 
 class AlertsFrame(customtkinter.CTkFrame):
     def __init__(self, master, **kwargs):
@@ -15,6 +25,7 @@ class AlertsFrame(customtkinter.CTkFrame):
         self.grid_rowconfigure(1, weight=1)
 
         self.style = configure_treeview_style()
+        self.loader = DataLoader(self, on_busy=self.set_loading)
 
         self.top_frame = CTkFrame(self, fg_color="transparent")
         self.top_frame.grid(row=0, column=0, sticky="ew", padx=10, pady=(10, 0))
@@ -31,11 +42,18 @@ class AlertsFrame(customtkinter.CTkFrame):
         )
         self.search_entry.grid(row=0, column=1, sticky="e", padx=5)
 
-        self.search_entry.bind("<KeyRelease>", self.on_search_change)
+        self.search_controller = SearchController(
+            self.search_entry,
+            search=Products().search_low_stock,
+            show_results=self.populate_tree,
+            show_all=self.refresh_tree,
+            search_text=lambda product: (product.product_name, product.supplier_name),
+            loader=self.loader,
+        )
 
         self.tree = ttk.Treeview(
             self,
-            columns=("ID", "Product", "Stock", "Status"),
+            columns=("ID", "Product", "Stock", "Reorder Level", "Status"),
             show="headings",
             height=15,
         )
@@ -43,16 +61,21 @@ class AlertsFrame(customtkinter.CTkFrame):
         self.tree.heading("ID", text="ID")
         self.tree.heading("Product", text="Product")
         self.tree.heading("Stock", text="Stock")
+        self.tree.heading("Reorder Level", text="Reorder Level")
         self.tree.heading("Status", text="Status")
 
         self.tree.column("ID", width=70, anchor="center")
         self.tree.column("Product", width=150, anchor="center")
         self.tree.column("Stock", width=100, anchor="center")
+        self.tree.column("Reorder Level", width=100, anchor="center")
         self.tree.column("Status", width=100, anchor="center")
 
         self.vsb = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
         self.hsb = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
         self.tree.configure(yscrollcommand=self.vsb.set, xscrollcommand=self.hsb.set)
+        self.virtual_tree = VirtualTree(
+            self.tree, self.vsb, self.format_row, loader=self.loader
+        )
 
         self.tree.grid(row=1, column=0, sticky="nsew", padx=10, pady=10)
         self.vsb.grid(row=1, column=1, sticky="ns", pady=10)
@@ -69,67 +92,44 @@ class AlertsFrame(customtkinter.CTkFrame):
         )
         self.refresh_button.grid(row=0, column=0, padx=5)
 
+        # Reload whenever stock changes, here or in another terminal
+        self.watcher = ChangeWatcher(
+            self, [(("products",), self.search_controller.refresh)]
+        )
+
         # Load Data
         self.refresh_tree()
 
     def refresh_all(self):
-        """Refresh all data in the frame"""
-        self.refresh_tree()
+        """Refresh the data in the frame if it changed"""
+        self.watcher.check()
+
+    def set_loading(self, loading):
+        """Show whether data is still being loaded in the background"""
+        self.title_label.configure(
+            text="Inventory Alerts (loading...)" if loading else "Inventory Alerts"
+        )
 
     def refresh_tree(self):
         """Refresh the tree with updated data"""
-        all_alerts = Products().get_low_stock_products()
-        if not all_alerts:
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            return
-
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        for row in all_alerts:
-            formatted_row = (
-                row[0],  # id
-                row[2],  # product
-                row[4],  # stock
-            )
-            if row[4] < 10:
-                formatted_row += ("Low Stock",)
-            elif row[4] <= 0:
-                formatted_row += ("Out of Stock",)
-            self.tree.insert("", "end", values=formatted_row)
-
-    def on_search_change(self, _event=None):
-        """Handle real-time search as user types"""
-        search_term = self.search_entry.get().lower()
-        all_alerts = Products().get_low_stock_products()
-        if not all_alerts:
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            return
-
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        for row in all_alerts:
-            formatted_row = (
-                row[0],  # id
-                row[2],  # product
-                row[4],  # stock
-            )
-            if row[4] < 10:
-                formatted_row += ("Low Stock",)
-            elif row[4] <= 0:
-                formatted_row += ("Out of Stock",)
-
-            search_row = tuple(
-                str(value).lower()
-                for value in (
-                    row[0],  # id
-                    row[2],  # product
-                    row[4],  # stock
-                )
+        self.search_controller.reset()
+        products = Products()
+        self.virtual_tree.show(
+            QuerySource(
+                products.count_low_stock_products, products.get_low_stock_window
             )
+        )
 
-            if search_term == "" or any(search_term in field for field in search_row):
-                self.tree.insert("", "end", values=formatted_row)
+    def populate_tree(self, all_alerts):
+        """Show the given low stock products in the tree"""
+        self.virtual_tree.show(ListSource(all_alerts), keep_position=False)
+
+    def format_row(self, product):
+        """Turn a low stock product into the values shown in the tree"""
+        return (
+            product.product_id,
+            product.product_name,
+            product.stock,
+            product.reorder_level,
+            SEVERITY_LABELS[product.severity],
+        )
@@ -2,9 +2,16 @@ from tkinter import StringVar, Variable, ttk
 
 from customtkinter import CTkButton, CTkEntry, CTkFrame, CTkLabel, CTkOptionMenu
 
+from app.frames.loader import DataLoader
+from app.frames.search import SearchController
 from app.frames.style import configure_treeview_style
+from app.frames.virtual_tree import ListSource, QuerySource, VirtualTree
+from app.db import ConflictError
+from app.frames.watcher import ChangeWatcher
+from app.frames.writes import WriteRunner
 from app.models.products import Products
 from app.models.suppliers import Suppliers
+from app.money import format_money, to_cents
 
 
 class InventoryFrame(CTkFrame):
@@ -15,6 +22,7 @@ class InventoryFrame(CTkFrame):
         self.grid_rowconfigure(1, weight=1)
 
         self.style = configure_treeview_style()
+        self.loader = DataLoader(self, on_busy=self.set_loading)
 
         self.top_frame = CTkFrame(self, fg_color="transparent")
         self.top_frame.grid(row=0, column=0, sticky="ew", padx=10, pady=(10, 0))
@@ -31,11 +39,37 @@ class InventoryFrame(CTkFrame):
         )
         self.search_entry.grid(row=0, column=1, sticky="e", padx=5)
 
-        self.search_entry.bind("<KeyRelease>", self.on_search_change)
+        self.search_controller = SearchController(
+            self.search_entry,
+            search=Products().search,
+            show_results=self.populate_tree,
+            show_all=self.refresh_tree,
+            search_text=lambda product: (product.product_name, product.supplier_name),
+            loader=self.loader,
+        )
 
+        # Version isn't shown, edits send it back to detect conflicting changes
         self.tree = ttk.Treeview(
             self,
-            columns=("ID", "Product", "Stock", "Price", "Total", "Updated", "Supplier"),
+            columns=(
+                "ID",
+                "Product",
+                "Stock",
+                "Price",
+                "Total",
+                "Updated",
+                "Supplier",
+                "Version",
+            ),
+            displaycolumns=(
+                "ID",
+                "Product",
+                "Stock",
+                "Price",
+                "Total",
+                "Updated",
+                "Supplier",
+            ),
             show="headings",
             height=15,
         )
@@ -59,6 +93,9 @@ class InventoryFrame(CTkFrame):
         self.vsb = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
         self.hsb = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
         self.tree.configure(yscrollcommand=self.vsb.set, xscrollcommand=self.hsb.set)
+        self.virtual_tree = VirtualTree(
+            self.tree, self.vsb, self.format_row, loader=self.loader
+        )
 
         self.tree.grid(row=1, column=0, sticky="nsew", padx=10, pady=10)
         self.vsb.grid(row=1, column=1, sticky="ns", pady=10)
@@ -96,7 +133,7 @@ class InventoryFrame(CTkFrame):
         # Button Frame with centering
         self.button_frame = CTkFrame(self, fg_color="transparent")
         self.button_frame.grid(row=4, column=0, sticky="ew", padx=10, pady=10)
-        self.button_frame.grid_columnconfigure((0, 1, 2, 3, 4), weight=1)
+        self.button_frame.grid_columnconfigure((0, 1, 2, 3, 4, 5), weight=1)
 
         self.add_button = CTkButton(
             self.button_frame, text="Add Product", command=self.add_item, width=120
@@ -134,17 +171,39 @@ class InventoryFrame(CTkFrame):
         )
         self.refresh_button.grid(row=0, column=4, padx=5)
 
+        self.import_button = CTkButton(
+            self.button_frame,
+            text="Import CSV",
+            command=self.import_items,
+            width=120,
+        )
+        self.import_button.grid(row=0, column=5, padx=5)
+
         # Bind selection event to tree
         self.tree.bind("<<TreeviewSelect>>", self.on_tree_select)
 
+        # Reload whatever changed, here or in another terminal
+        self.watcher = ChangeWatcher(
+            self,
+            [
+                (("products",), self.search_controller.refresh),
+                (("suppliers",), self.load_suppliers),
+            ],
+        )
+
+        self.writes = WriteRunner(
+            self.loader,
+            [self.add_button, self.edit_button, self.delete_button],
+            self.refresh_all,
+        )
+
         # Load Data
         self.refresh_tree()
         self.load_suppliers()
 
     def refresh_all(self):
-        """Refresh all data in the frame"""
-        self.refresh_tree()
-        self.load_suppliers()
+        """Refresh the data in the frame that changed"""
+        self.watcher.check()
         self.clear_entries()
 
     def clear_entries(self):
@@ -172,50 +231,50 @@ class InventoryFrame(CTkFrame):
 
     def load_suppliers(self):
         """Load suppliers to the option menu"""
-        suppliers = Suppliers().get_all_suppliers()
+        self.loader.submit(
+            "suppliers", Suppliers().get_all_suppliers, self.show_suppliers
+        )
+
+    def show_suppliers(self, suppliers):
+        """Fill the option menu with the loaded suppliers"""
         if not suppliers:
             return
 
-        supplier_names = [supplier[1] for supplier in suppliers]
+        supplier_names = [supplier.company_name for supplier in suppliers]
         self.supplier_options.configure(values=supplier_names)
 
+    def set_loading(self, loading):
+        """Show whether data is still being loaded in the background"""
+        self.title_label.configure(
+            text="Product List (loading...)" if loading else "Product List"
+        )
+
     def refresh_tree(self):
         """Refresh the tree with updated data"""
-        from datetime import datetime
-
-        products = Products().get_all_products()
-        if not products:
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            return
-
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        for row in products:
-            total = float(row[3]) * float(row[4])
-            total_formatted = f"₱{total:.2f}"
-            price_formatted = f"₱{float(row[3]):.2f}"
-
-            try:
-                date_obj = datetime.strptime(row[6], "%Y-%m-%d %H:%M:%S")
-                date_formatted = date_obj.strftime("%d/%m/%Y")
-            except (ValueError, TypeError):
-                date_formatted = row[6]
-
-            self.tree.insert(
-                "",
-                "end",
-                values=(
-                    row[0],  # id
-                    row[2],  # name
-                    row[4],  # stock
-                    price_formatted,  # price
-                    total_formatted,  # total
-                    date_formatted,  # updated date in DD/MM/YYYY format
-                    row[5],  # supplier
-                ),
+        self.search_controller.reset()
+        products = Products()
+        self.virtual_tree.show(
+            QuerySource(
+                products.count_products, products.get_products_window, "product_id"
             )
+        )
+
+    def populate_tree(self, products):
+        """Show the given products in the tree"""
+        self.virtual_tree.show(ListSource(products), keep_position=False)
+
+    def format_row(self, product):
+        """Turn a product into the values shown in the tree"""
+        return (
+            product.product_id,
+            product.product_name,
+            product.stock,
+            format_money(product.price_cents),
+            format_money(product.total_cents),
+            product.updated_on,  # DD/MM/YYYY
+            product.supplier_name,
+            product.row_version,
+        )
 
     def add_item(self):
         """Add new item to the tree"""
@@ -225,14 +284,24 @@ class InventoryFrame(CTkFrame):
         supplier = self.supplier_options.get()
 
         if product and stock and price and supplier:
-            if Products().add_product(product, price, stock, supplier):
-                self.refresh_tree()
-                self.load_suppliers()
-                self.clear_entries()
-            else:
-                from tkinter import messagebox
+            from tkinter import messagebox
 
-                messagebox.showerror("Cannot Add Product", "Product already exists")
+            try:
+                price_cents = to_cents(price)
+                stock = int(stock)
+            except ValueError:
+                messagebox.showerror("Invalid Input", "Invalid price or stock value")
+                return
+
+            self.writes.run(
+                "Cannot Add Product",
+                "Product already exists",
+                Products().add_product,
+                product,
+                price_cents,
+                stock,
+                supplier,
+            )
 
     def edit_item(self):
         """Edit selected item in the tree"""
@@ -243,6 +312,7 @@ class InventoryFrame(CTkFrame):
         item = selected_items[0]
         values = self.tree.item(item)["values"]
         product_id = values[0]
+        row_version = int(values[7])
 
         product = self.product_entry.get()
         stock = self.stock_entry.get()
@@ -252,24 +322,96 @@ class InventoryFrame(CTkFrame):
         if not all([product, stock, price, supplier]):
             return
 
+        from tkinter import messagebox
+
         try:
-            price = float(price)
+            price_cents = to_cents(price)
             stock = int(stock)
+        except ValueError:
+            messagebox.showerror("Invalid Input", "Invalid price or stock value")
+            return
 
-            from tkinter import messagebox
+        if messagebox.askyesno(
+            "Confirm Edit", "Are you sure you want to edit this item?"
+        ):
+            self.writes.run(
+                "Cannot Edit Product",
+                "Product not found or name already in use",
+                Products().edit_product,
+                product_id,
+                product,
+                price_cents,
+                stock,
+                supplier,
+                row_version,
+                on_error=self.show_edit_error,
+            )
 
-            if messagebox.askyesno(
-                "Confirm Edit", "Are you sure you want to edit this item?"
-            ):
-                if Products().edit_product(product_id, product, price, stock, supplier):
-                    self.refresh_tree()
-                    self.load_suppliers()
-                    self.clear_entries()
-                else:
-                    messagebox.showerror("Cannot Add Product", "Product already exists")
+    def show_edit_error(self, error):
+        """Report an edit that wasn't saved because of a conflicting change"""
+        from tkinter import messagebox
 
-        except ValueError:
-            print("Invalid price or stock value")
+        if not isinstance(error, ConflictError):
+            messagebox.showerror("Cannot Edit Product", str(error))
+            return
+
+        # Show the other terminal's change so the user can edit on top of it
+        self.watcher.check()
+        self.clear_entries()
+        messagebox.showwarning(
+            "Product Changed",
+            "This product was changed in another terminal. The list now shows "
+            "the latest details, please check them and edit again.",
+        )
+
+    def import_items(self):
+        """Import products from a CSV file chosen by the user"""
+        from tkinter import filedialog
+
+        path = filedialog.askopenfilename(
+            title="Import Products", filetypes=[("CSV files", "*.csv")]
+        )
+        if not path:
+            return
+
+        self.import_button.configure(state="disabled")
+        self.loader.submit(
+            "import",
+            Products().import_products_csv,
+            self.show_import_result,
+            path,
+            on_error=self.show_import_error,
+            write=True,
+        )
+
+    def show_import_result(self, result):
+        """Report how the CSV import went and show the new products"""
+        from tkinter import messagebox
+
+        imported, errors = result
+        self.import_button.configure(state="normal")
+        self.refresh_all()
+
+        message = f"Imported {imported} products."
+        if errors:
+            lines = [
+                f"Line {line}: {reason}" if line is not None else reason
+                for line, reason in errors[:10]
+            ]
+            if len(errors) > 10:
+                lines.append(f"...and {len(errors) - 10} more")
+            message += f"\n\nSkipped {len(errors)} rows:\n" + "\n".join(lines)
+            messagebox.showwarning("Import Products", message)
+        else:
+            messagebox.showinfo("Import Products", message)
+
+    def show_import_error(self, error):
+        """Report an import that failed outright"""
+        from tkinter import messagebox
+
+        self.import_button.configure(state="normal")
+        self.refresh_all()
+        messagebox.showerror("Import Products", str(error))
 
     def delete_item(self):
         """Delete selected item from the tree"""
@@ -286,58 +428,9 @@ class InventoryFrame(CTkFrame):
         if messagebox.askyesno(
             "Confirm Delete", "Are you sure you want to delete this item?"
         ):
-            if Products().delete_product(product_id):
-                self.refresh_tree()
-                self.load_suppliers()
-                self.clear_entries()
-            else:
-                messagebox.showerror("Cannot Delete Product", "Product not found")
-
-    def on_search_change(self, _event=None):
-        """Handle real-time search as user types"""
-        from datetime import datetime
-
-        search_term = self.search_entry.get().lower()
-        products = Products().get_all_products()
-        if not products:
-            return
-
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        for row in products:
-            total = float(row[3]) * float(row[4])
-            total_formatted = f"₱{total:.2f}"
-            price_formatted = f"₱{float(row[3]):.2f}"
-
-            try:
-                date_obj = datetime.strptime(row[6], "%Y-%m-%d %H:%M:%S")
-                date_formatted = date_obj.strftime("%d/%m/%Y")
-            except (ValueError, TypeError):
-                date_formatted = row[6]
-
-            formatted_row = (
-                row[0],  # id
-                row[2],  # name
-                row[4],  # stock
-                price_formatted,  # price
-                total_formatted,  # total
-                date_formatted,  # updated date
-                row[5],  # supplier
+            self.writes.run(
+                "Cannot Delete Product",
+                "Product not found, or it has sales on record",
+                Products().delete_product,
+                product_id,
             )
-
-            search_row = tuple(
-                str(value).lower()
-                for value in (
-                    row[0],  # id
-                    row[2],  # name
-                    row[4],  # stock
-                    price_formatted,  # price
-                    total_formatted,  # total
-                    date_formatted,  # updated date
-                    row[5],  # supplier
-                )
-            )
-
-            if search_term == "" or any(search_term in field for field in search_row):
-                self.tree.insert("", "end", values=formatted_row)
@@ -0,0 +1,102 @@
+import itertools
+import logging
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared by every frame. Each worker thread gets its own SQLite connection
+# from app.db, so queries never run on (or block) the Tk main loop.
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="data-loader")
+
+# Writes and imports wait on the single database writer, an import for the
+# whole file. They get their own workers so reads never queue behind them.
+_write_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="data-writer")
+
+
+class DataLoader:
+    """Run model queries off the UI thread and deliver results back on it
+
+    Finished results are put on a queue that the Tk main loop polls with
+    after(). Every request has a key, and a newer request with the same key
+    supersedes older ones: their results are dropped instead of shown.
+    """
+
+    def __init__(self, widget, on_busy=None, poll_interval=30):
+        self.widget = widget
+        self.on_busy = on_busy  # called with True/False as loading starts/ends
+        self.poll_interval = poll_interval
+
+        self.results = queue.Queue()
+        self.pending = {}  # key -> id of the newest request
+        self._ids = itertools.count()
+        self._polling = False
+
+    def submit(self, key, func, callback, *args, on_error=None, write=False):
+        """Run func(*args) on a worker and call callback(result) on the UI thread
+
+        If func raises, on_error(exception) is called instead, or the error
+        is only logged without one. Model writes pass write=True.
+        """
+        request_id = next(self._ids)
+        was_busy = bool(self.pending)
+        self.pending[key] = request_id
+
+        executor = _write_executor if write else _executor
+        future = executor.submit(func, *args)
+        future.add_done_callback(
+            lambda done: self.results.put(
+                (key, request_id, done, callback, on_error)
+            )
+        )
+
+        if not was_busy and self.on_busy is not None:
+            self.on_busy(True)
+
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_interval, self._poll)
+
+    def cancel(self, key):
+        """Drop the result of the pending request for key, if any"""
+        self.pending.pop(key, None)
+        self._check_idle()
+
+    def _poll(self):
+        try:
+            self._deliver()
+        finally:
+            self._check_idle()
+
+            if self.pending:
+                self.widget.after(self.poll_interval, self._poll)
+            else:
+                self._polling = False
+
+    def _deliver(self):
+        while True:
+            try:
+                key, request_id, future, callback, on_error = (
+                    self.results.get_nowait()
+                )
+            except queue.Empty:
+                return
+
+            # Superseded by a newer request with the same key
+            if self.pending.get(key) != request_id:
+                continue
+
+            del self.pending[key]
+
+            try:
+                result = future.result()
+            except Exception as e:
+                if on_error is not None:
+                    on_error(e)
+                else:
+                    logging.error(f"Error: {e}")
+                continue
+
+            callback(result)
+
+    def _check_idle(self):
+        if not self.pending and self.on_busy is not None:
+            self.on_busy(False)
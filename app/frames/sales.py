@@ -3,7 +3,12 @@ from tkinter import ttk
 import customtkinter
 from customtkinter import CTkButton, CTkEntry, CTkFrame, CTkLabel, CTkOptionMenu
 
+from app.frames.loader import DataLoader
+from app.frames.search import SearchController
 from app.frames.style import configure_treeview_style
+from app.frames.virtual_tree import ListSource, QuerySource, VirtualTree
+from app.frames.watcher import ChangeWatcher
+from app.frames.writes import WriteRunner
 from app.models.sales import Sales
 
 
@@ -15,6 +20,7 @@ class SalesFrame(customtkinter.CTkFrame):
         self.grid_rowconfigure(1, weight=1)
 
         self.style = configure_treeview_style()
+        self.loader = DataLoader(self, on_busy=self.set_loading)
 
         self.top_frame = CTkFrame(self, fg_color="transparent")
         self.top_frame.grid(row=0, column=0, sticky="ew", padx=10, pady=(10, 0))
@@ -31,7 +37,14 @@ class SalesFrame(customtkinter.CTkFrame):
         )
         self.search_entry.grid(row=0, column=1, sticky="e", padx=5)
 
-        self.search_entry.bind("<KeyRelease>", self.on_search_change)
+        self.search_controller = SearchController(
+            self.search_entry,
+            search=Sales().search,
+            show_results=self.populate_tree,
+            show_all=self.refresh_tree,
+            search_text=lambda sale: (sale.product_name, sale.supplier_name),
+            loader=self.loader,
+        )
 
         self.tree = ttk.Treeview(
             self,
@@ -53,6 +66,9 @@ class SalesFrame(customtkinter.CTkFrame):
         self.vsb = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
         self.hsb = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
         self.tree.configure(yscrollcommand=self.vsb.set, xscrollcommand=self.hsb.set)
+        self.virtual_tree = VirtualTree(
+            self.tree, self.vsb, self.format_row, loader=self.loader
+        )
 
         self.tree.grid(row=1, column=0, sticky="nsew", padx=10, pady=10)
         self.vsb.grid(row=1, column=1, sticky="ns", pady=10)
@@ -79,10 +95,10 @@ class SalesFrame(customtkinter.CTkFrame):
         self.button_frame.grid(row=4, column=0, sticky="ew", padx=10, pady=10)
         self.button_frame.grid_columnconfigure((0, 1, 2), weight=1)
 
-        self.edit_button = CTkButton(
-            self.button_frame, text="Edit Sale", command=self.edit_item, width=120
+        self.record_button = CTkButton(
+            self.button_frame, text="Record Sale", command=self.record_item, width=120
         )
-        self.edit_button.grid(row=0, column=0, padx=5)
+        self.record_button.grid(row=0, column=0, padx=5)
 
         self.clear_button = CTkButton(
             self.button_frame,
@@ -103,14 +119,24 @@ class SalesFrame(customtkinter.CTkFrame):
         # Bind selection event to tree
         self.tree.bind("<<TreeviewSelect>>", self.on_tree_select)
 
+        # Reload whatever changed, here or in another terminal
+        self.watcher = ChangeWatcher(
+            self,
+            [
+                (("sales", "products"), self.search_controller.refresh),
+                (("products",), self.load_products),
+            ],
+        )
+
+        self.writes = WriteRunner(self.loader, [self.record_button], self.refresh_all)
+
         # Load Data
         self.refresh_tree()
         self.load_products()
 
     def refresh_all(self):
-        """Refresh all data in the frame"""
-        self.refresh_tree()
-        self.load_products()
+        """Refresh the data in the frame that changed"""
+        self.watcher.check()
         self.clear_entries()
 
     def clear_entries(self):
@@ -132,99 +158,72 @@ class SalesFrame(customtkinter.CTkFrame):
 
     def load_products(self):
         """Load all products into the option menu"""
-        product_names = Sales().get_all_product_name()
-        if not product_names:
-            product_names = []
-        product_names = [product[0] for product in product_names]
+        self.loader.submit(
+            "products", Sales().get_all_product_name, self.show_products
+        )
 
+    def show_products(self, product_names):
+        """Fill the option menu with the loaded product names"""
         if not product_names:
             product_names = ["No Products"]
 
         self.product_options.configure(values=product_names)
 
+    def set_loading(self, loading):
+        """Show whether data is still being loaded in the background"""
+        self.title_label.configure(
+            text="Sales List (loading...)" if loading else "Sales List"
+        )
+
     def refresh_tree(self):
         """Refresh the tree with updated data"""
-        all_sales = Sales().get_all_sales()
-        if not all_sales:
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            return
-
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        for row in all_sales:
-            formatted_row = (
-                row[0],  # id
-                row[1],  # product
-                row[2],  # sold
-                row[3],  # supplier
-            )
-            self.tree.insert("", "end", values=formatted_row)
-
-    def edit_item(self):
-        """Edit selected sales in the tree"""
-        selected_items = self.tree.selection()
-        if not selected_items:
-            return
+        self.search_controller.reset()
+        sales = Sales()
+        self.virtual_tree.show(
+            QuerySource(sales.count_sales, sales.get_sales_window, "sale_id")
+        )
 
-        item = selected_items[0]
-        values = self.tree.item(item)["values"]
-        supplier_id = values[0]
+    def populate_tree(self, all_sales):
+        """Show the given sales in the tree"""
+        self.virtual_tree.show(ListSource(all_sales), keep_position=False)
+
+    def format_row(self, sale):
+        """Turn a sale into the values shown in the tree"""
+        return (
+            sale.sale_id,
+            sale.product_name,
+            sale.quantity,
+            sale.supplier_name,
+        )
 
+    def record_item(self):
+        """Record a sale of the chosen product and take it out of stock"""
+        product = self.product_options.get()
         sold = self.sold_entry.get()
         from tkinter import messagebox
 
-        if not sold:
+        if not product or not sold:
             return
 
         try:
             sold = int(sold)
-            if messagebox.askyesno(
-                "Confirm Edit", "Are you sure you want to edit this item?"
-            ):
-                if Sales().edit_sales(
-                    supplier_id,
-                    sold,
-                ):
-                    print("HELLO")
-                    self.refresh_tree()
-                    self.clear_entries()
-                else:
-                    messagebox.showerror("Cannot Edit Sales", "Sales not found")
-
         except ValueError:
-            messagebox.showerror("Invalid Input", "Invalid email and contact number")
-
-    def on_search_change(self, _event=None):
-        """Handle real-time search as user types"""
-        search_term = self.search_entry.get().lower()
-        all_sales = Sales().get_all_sales()
-        if not all_sales:
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            return
+            sold = 0
 
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        if sold <= 0:
+            messagebox.showerror("Invalid Input", "Sold must be a positive number")
+            return
 
-        for row in all_sales:
-            formatted_row = (
-                row[0],  # id
-                row[1],  # product
-                row[2],  # sold
-                row[3],  # supplier
-            )
+        product_id = Sales().get_product_id(product)
+        if product_id is None:
+            messagebox.showerror("Cannot Record Sale", "Product not found")
+            return
 
-            search_row = tuple(
-                str(value).lower()
-                for value in (
-                    row[0],  # id
-                    row[1],  # product
-                    row[2],  # sold
-                    row[3],  # supplier
-                )
+        if messagebox.askyesno("Confirm Sale", f"Record a sale of {sold} x {product}?"):
+            self.writes.run(
+                "Cannot Record Sale",
+                "Not enough stock",
+                Sales().record_sale,
+                product_id,
+                sold,
             )
-
-            if search_term == "" or any(search_term in field for field in search_row):
-                self.tree.insert("", "end", values=formatted_row)
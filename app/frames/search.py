@@ -0,0 +1,119 @@
+import re
+import unicodedata
+
+
+def fold(text):
+    """Lowercase text and strip accents, as the FTS5 unicode61 tokenizer does"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+class SearchController:
+    """Debounced incremental search behind a frame's search entry
+
+    Keystrokes only (re)start a short timer, so typing a word runs one query
+    instead of one per key. When the new term just narrows the previous one,
+    the rows already found are filtered in memory instead of asking the
+    database again, using the same word-prefix rule as the search index.
+    Given a DataLoader, database searches run on a worker thread.
+    """
+
+    def __init__(
+        self,
+        entry,
+        search,
+        show_results,
+        show_all,
+        search_text,
+        loader=None,
+        delay=200,
+    ):
+        self.entry = entry
+        self.search = search  # term -> matching rows
+        self.show_results = show_results  # rows -> None
+        self.show_all = show_all  # called when the entry is cleared
+        self.search_text = search_text  # row -> the indexed text fields
+        self.loader = loader
+        self.delay = delay
+
+        self.term = ""
+        self.results = None
+        self._after_id = None
+
+        self.entry.bind("<KeyRelease>", self.on_key_release)
+
+    def on_key_release(self, _event=None):
+        """Restart the timer on every keystroke"""
+        if self._after_id is not None:
+            self.entry.after_cancel(self._after_id)
+
+        self._after_id = self.entry.after(self.delay, self._run)
+
+    def reset(self):
+        """Forget the previous results, e.g. after the data changed"""
+        self.term = ""
+        self.results = None
+
+    def refresh(self):
+        """Show fresh rows for the current term, or all rows without one"""
+        if not self.term:
+            self.show_all()
+            return
+
+        # Filtering the old results in memory would keep them stale
+        self.results = None
+        self._search(self.term)
+
+    def _run(self):
+        self._after_id = None
+
+        term = self.entry.get().strip()
+        if term == self.term:
+            return
+
+        if not term:
+            if self.loader is not None:
+                self.loader.cancel("search")
+            self.reset()
+            self.show_all()
+            return
+
+        if self._narrows(term):
+            rows = [row for row in self.results if self._matches(row, term)]
+            self._show(term, rows)
+        else:
+            self._search(term)
+
+    def _search(self, term):
+        if self.loader is None:
+            self._show(term, self.search(term))
+        else:
+            self.loader.submit(
+                "search", self.search, lambda rows: self._show(term, rows), term
+            )
+
+    def _show(self, term, rows):
+        # The user kept typing while the query ran, let the next run show it
+        if self.entry.get().strip() != term:
+            return
+
+        self.term = term
+        self.results = rows
+        self.show_results(rows)
+
+    def _narrows(self, term):
+        # Numbers also match IDs, which are not in the loaded text
+        return (
+            self.results is not None
+            and self.term
+            and term.startswith(self.term)
+            and not term.isdigit()
+        )
+
+    def _matches(self, row, term):
+        text = " ".join(str(value) for value in self.search_text(row))
+        tokens = re.findall(r"\w+", fold(text))
+        return all(
+            any(token.startswith(word) for token in tokens)
+            for word in re.findall(r"\w+", fold(term))
+        )
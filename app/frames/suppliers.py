@@ -2,8 +2,13 @@ from tkinter import ttk
 
 from customtkinter import CTkButton, CTkEntry, CTkFrame, CTkLabel
 
+from app.frames.loader import DataLoader
+from app.frames.search import SearchController
 from app.frames.style import configure_treeview_style
-from app.models.suppliers import Suppliers
+from app.frames.virtual_tree import ListSource, QuerySource, VirtualTree
+from app.frames.watcher import ChangeWatcher
+from app.frames.writes import WriteRunner
+from app.models.suppliers import Suppliers, is_valid_contact
 
 
 class SuppliersFrame(CTkFrame):
@@ -14,6 +19,7 @@ class SuppliersFrame(CTkFrame):
         self.grid_rowconfigure(1, weight=1)
 
         self.style = configure_treeview_style()
+        self.loader = DataLoader(self, on_busy=self.set_loading)
 
         self.top_frame = CTkFrame(self, fg_color="transparent")
         self.top_frame.grid(row=0, column=0, sticky="ew", padx=10, pady=(10, 0))
@@ -30,7 +36,19 @@ class SuppliersFrame(CTkFrame):
         )
         self.search_entry.grid(row=0, column=1, sticky="e", padx=5)
 
-        self.search_entry.bind("<KeyRelease>", self.on_search_change)
+        self.search_controller = SearchController(
+            self.search_entry,
+            search=Suppliers().search,
+            show_results=self.populate_tree,
+            show_all=self.refresh_tree,
+            search_text=lambda supplier: (
+                supplier.company_name,
+                supplier.supplier_name,
+                supplier.email,
+                supplier.phone,
+            ),
+            loader=self.loader,
+        )
 
         self.tree = ttk.Treeview(
             self,
@@ -54,6 +72,9 @@ class SuppliersFrame(CTkFrame):
         self.vsb = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
         self.hsb = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
         self.tree.configure(yscrollcommand=self.vsb.set, xscrollcommand=self.hsb.set)
+        self.virtual_tree = VirtualTree(
+            self.tree, self.vsb, self.format_row, loader=self.loader
+        )
 
         self.tree.grid(row=1, column=0, sticky="nsew", padx=10, pady=10)
         self.vsb.grid(row=1, column=1, sticky="ns", pady=10)
@@ -121,9 +142,25 @@ class SuppliersFrame(CTkFrame):
         # Bind selection event to tree
         self.tree.bind("<<TreeviewSelect>>", self.on_tree_select)
 
+        # Reload whatever changed, here or in another terminal
+        self.watcher = ChangeWatcher(
+            self, [(("suppliers",), self.search_controller.refresh)]
+        )
+
+        self.writes = WriteRunner(
+            self.loader,
+            [self.add_button, self.edit_button, self.delete_button],
+            self.refresh_all,
+        )
+
         # Load Data
         self.refresh_tree()
 
+    def refresh_all(self):
+        """Refresh the data in the frame that changed"""
+        self.watcher.check()
+        self.clear_entries()
+
     def clear_entries(self):
         """Clear all entry fields"""
         self.company_entry.delete(0, "end")
@@ -145,26 +182,35 @@ class SuppliersFrame(CTkFrame):
             self.email_entry.insert(0, values[3])
             self.contact_entry.insert(0, str(values[4]))
 
+    def set_loading(self, loading):
+        """Show whether data is still being loaded in the background"""
+        self.title_label.configure(
+            text="Supplier List (loading...)" if loading else "Supplier List"
+        )
+
     def refresh_tree(self):
         """Refresh the tree with updated data"""
-        all_suppliers = Suppliers().get_all_suppliers()
-        if not all_suppliers:
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            return
-
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        for row in all_suppliers:
-            formatted_row = (
-                row[0],  # id
-                row[1],  # company
-                row[3],  # supplier
-                row[2],  # email
-                row[4],  # contact
+        self.search_controller.reset()
+        suppliers = Suppliers()
+        self.virtual_tree.show(
+            QuerySource(
+                suppliers.count_suppliers, suppliers.get_suppliers_window, "supplier_id"
             )
-            self.tree.insert("", "end", values=formatted_row)
+        )
+
+    def populate_tree(self, all_suppliers):
+        """Show the given suppliers in the tree"""
+        self.virtual_tree.show(ListSource(all_suppliers), keep_position=False)
+
+    def format_row(self, supplier):
+        """Turn a supplier into the values shown in the tree"""
+        return (
+            supplier.supplier_id,
+            supplier.company_name,
+            supplier.supplier_name,
+            supplier.email,
+            supplier.phone,
+        )
 
     def add_supplier(self):
         """Add new supplier to the tree"""
@@ -174,25 +220,19 @@ class SuppliersFrame(CTkFrame):
         contact = self.contact_entry.get()
         from tkinter import messagebox
 
-        valid_email = "@" in email and "." in email
-        valid_contact = (
-            contact.isdigit()
-            and len(contact) == 11
-            and contact[0] == "0"
-            and contact[1] == "9"
-        )
-
-        if not valid_email or not valid_contact:
+        if not is_valid_contact(email, contact):
             messagebox.showerror("Invalid Email", "Invalid email and contact number")
         else:
             if company and supplier and email and contact:
-                if Suppliers().add_supplier(company, email, supplier, contact):
-                    self.refresh_tree()
-                    self.clear_entries()
-                else:
-                    messagebox.showerror(
-                        "Cannot Add Supplier", "Supplier already exists"
-                    )
+                self.writes.run(
+                    "Cannot Add Supplier",
+                    "Supplier already exists",
+                    Suppliers().add_supplier,
+                    company,
+                    supplier,
+                    email,
+                    contact,
+                )
 
     def edit_item(self):
         """Edit selected supplier in the tree"""
@@ -210,37 +250,24 @@ class SuppliersFrame(CTkFrame):
         contact = self.contact_entry.get()
         from tkinter import messagebox
 
-        valid_email = "@" in email and "." in email
-        valid_contact = (
-            contact.isdigit()
-            and len(contact) == 11
-            and contact[0] == "0"
-            and contact[1] == "9"
-        )
-
-        if not valid_email or not valid_contact:
+        if not is_valid_contact(email, contact):
             messagebox.showerror("Invalid Email", "Invalid email and contact number")
         else:
             if not all([company, supplier, email, contact]):
                 return
 
-            try:
-                if messagebox.askyesno(
-                    "Confirm Edit", "Are you sure you want to edit this item?"
-                ):
-                    if Suppliers().edit_supplier(
-                        supplier_id, company, email, supplier, contact
-                    ):
-                        self.refresh_tree()
-                        self.clear_entries()
-                    else:
-                        messagebox.showerror(
-                            "Cannot Edit Supplier", "Supplier not found"
-                        )
-
-            except ValueError:
-                messagebox.showerror(
-                    "Invalid Input", "Invalid email and contact number"
+            if messagebox.askyesno(
+                "Confirm Edit", "Are you sure you want to edit this item?"
+            ):
+                self.writes.run(
+                    "Cannot Edit Supplier",
+                    "Supplier not found, or its details are already in use",
+                    Suppliers().edit_supplier,
+                    supplier_id,
+                    company,
+                    supplier,
+                    email,
+                    contact,
                 )
 
     def delete_item(self):
@@ -258,43 +285,9 @@ class SuppliersFrame(CTkFrame):
         if messagebox.askyesno(
             "Confirm Delete", "Are you sure you want to delete this item?"
         ):
-            if Suppliers().delete_supplier(supplier_id):
-                self.refresh_tree()
-                self.clear_entries()
-            else:
-                messagebox.showerror("Cannot Delete Product", "Product not found")
-
-    def on_search_change(self, _event=None):
-        """Handle real-time search as user types"""
-        search_term = self.search_entry.get().lower()
-        all_supplier = Suppliers().get_all_suppliers()
-        if not all_supplier:
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            return
-
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        for row in all_supplier:
-            formatted_row = (
-                row[0],  # id
-                row[1],  # company
-                row[3],  # supplier
-                row[2],  # email
-                row[4],  # contact
-            )
-
-            search_row = tuple(
-                str(value).lower()
-                for value in (
-                    row[0],  # id
-                    row[1],  # company
-                    row[3],  # supplier
-                    row[2],  # email
-                    row[4],  # contact
-                )
+            self.writes.run(
+                "Cannot Delete Supplier",
+                "Supplier not found",
+                Suppliers().delete_supplier,
+                supplier_id,
             )
-
-            if search_term == "" or any(search_term in field for field in search_row):
-                self.tree.insert("", "end", values=formatted_row)
@@ -0,0 +1,50 @@
+class TreeSync:
+    """Keep a ttk.Treeview in step with a list of rows without rebuilding it
+
+    The first value of every row is its primary key and becomes the item
+    iid, so a refresh only inserts, updates or deletes the rows that
+    actually changed. Selection and scroll position survive the refresh.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.rows = {}  # iid -> values currently shown
+        self.order = []  # iids in display order
+
+    def sync(self, rows):
+        """Show the given rows, touching only the items that changed"""
+        tree = self.tree
+        scroll = tree.yview()[0]
+
+        new_rows = {}
+        order = []
+        for values in rows or ():
+            iid = str(values[0])
+            if iid not in new_rows:
+                new_rows[iid] = tuple(values)
+                order.append(iid)
+
+        removed = [iid for iid in self.order if iid not in new_rows]
+        if removed:
+            tree.delete(*removed)
+
+        current_order = [iid for iid in self.order if iid in new_rows]
+        for iid in order:
+            old_values = self.rows.get(iid)
+            if old_values is None:
+                tree.insert("", "end", iid=iid, values=new_rows[iid])
+                current_order.append(iid)
+            elif old_values != new_rows[iid]:
+                tree.item(iid, values=new_rows[iid])
+
+        if current_order != order:
+            tree.set_children("", *order)
+
+        self.rows = new_rows
+        self.order = order
+
+        tree.yview_moveto(scroll)
+
+    def clear(self):
+        """Remove every row from the tree"""
+        self.sync(())
@@ -0,0 +1,230 @@
+from app.frames.tree_sync import TreeSync
+
+
+class ListSource:
+    """Rows that are already in memory, such as search results"""
+
+    def __init__(self, rows):
+        self.rows = list(rows or ())
+
+    def count(self):
+        return len(self.rows)
+
+    def fetch(self, offset, limit):
+        return self.rows[offset : offset + limit]
+
+
+class QuerySource:
+    """Rows pulled from the model a window at a time
+
+    The models don't cache windows, every scroll position would be an entry
+    of its own. Given the rows' key attribute, a window starting inside or
+    just after the previous one is read by fetch(offset, limit, after_id)
+    from the key of the row above it, so scrolling down seeks through the
+    index instead of stepping over every earlier row with OFFSET. Jumps and
+    scrolling up still read by offset.
+    """
+
+    def __init__(self, count, fetch, key=None):
+        self._count = count
+        self._fetch = fetch
+        self.key = key
+        self.window = (0, [])  # offset and rows of the last fetch
+
+    def count(self):
+        return self._count() or 0
+
+    def fetch(self, offset, limit):
+        start, rows = self.window
+        if self.key is not None and start < offset <= start + len(rows):
+            after_id = getattr(rows[offset - start - 1], self.key)
+            rows = self._fetch(offset, limit, after_id) or []
+        else:
+            rows = self._fetch(offset, limit) or []
+
+        self.window = (offset, rows)
+        return rows
+
+
+class VirtualTree:
+    """Drive a ttk.Treeview that only holds the rows currently on screen
+
+    The tree keeps a small pool of items matching its visible height, while
+    the vertical scrollbar is driven from the total row count of the source.
+    Scrolling asks the source for the new window and syncs it into the tree
+    by primary key, so only rows entering or leaving the view are touched.
+    Given a DataLoader, the source is read on a worker thread.
+    """
+
+    def __init__(self, tree, scrollbar, format_row, loader=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.format_row = format_row
+        self.loader = loader
+        self.tree_sync = TreeSync(tree)
+
+        self.source = ListSource(())
+        self.total = 0
+        self.offset = 0
+        self.visible_rows = int(tree.cget("height"))
+        self.selected = ()
+        self._select_after = None  # "first" or "last" once the window arrives
+        self._needs_count = True  # until a load with a fresh total is shown
+
+        # The tree never has anything to scroll itself, the scrollbar is ours
+        self.tree.configure(yscrollcommand="")
+        self.scrollbar.configure(command=self.yview)
+
+        # Bind through our own tag so the frame's bindings don't replace ours,
+        # and so returning "break" skips the Treeview's default handling
+        tag = f"VirtualTree{id(self)}"
+        self.tree.bindtags((tag,) + self.tree.bindtags())
+        self.tree.bind_class(tag, "<<TreeviewSelect>>", self._on_select)
+        self.tree.bind_class(tag, "<Configure>", self._on_configure)
+        self.tree.bind_class(tag, "<MouseWheel>", self._on_mousewheel)
+        self.tree.bind_class(tag, "<Button-4>", self._on_mousewheel)
+        self.tree.bind_class(tag, "<Button-5>", self._on_mousewheel)
+        self.tree.bind_class(tag, "<Up>", self._on_key_up)
+        self.tree.bind_class(tag, "<Down>", self._on_key_down)
+        self.tree.bind_class(
+            tag, "<Prior>", lambda _event: self.yview("scroll", -1, "pages")
+        )
+        self.tree.bind_class(
+            tag, "<Next>", lambda _event: self.yview("scroll", 1, "pages")
+        )
+
+    def show(self, source, keep_position=True):
+        """Display a new source, staying at the same offset unless told not to"""
+        self.source = source
+        if not keep_position:
+            self.offset = 0
+
+        self._needs_count = True
+        self._load()
+
+    def refresh(self):
+        """Re-read the current source, e.g. after the data behind it changed"""
+        self.show(self.source)
+
+    def yview(self, *args):
+        """Scrollbar command, accepting the same arguments as Treeview.yview"""
+        if args[0] == "moveto":
+            self.scroll_to(round(float(args[1]) * self.total))
+        elif args[0] == "scroll":
+            step = self.visible_rows if args[2] == "pages" else 1
+            self.scroll_to(self.offset + int(args[1]) * step)
+
+        return "break"
+
+    def scroll_to(self, offset):
+        offset = max(0, min(offset, self.total - self.visible_rows))
+        if offset != self.offset:
+            self.offset = offset
+            self._update_scrollbar()
+            self._load()
+
+    def _load(self):
+        # A newer load drops any pending one, so keep asking for the total
+        # until a load that includes it has actually been displayed
+        args = (self.source, self.offset, self.visible_rows, self._needs_count)
+        if self.loader is None:
+            self._display(self._fetch(*args))
+        else:
+            self.loader.submit("window", self._fetch, self._display, *args)
+
+    def _fetch(self, source, offset, limit, count):
+        """Read one window from the source, runs on the loader's worker"""
+        total = source.count() if count else None
+        if total is not None:
+            # Clamp in case rows were removed since the last load
+            offset = max(0, min(offset, total - limit))
+
+        return source, total, offset, source.fetch(offset, limit)
+
+    def _display(self, result):
+        source, total, offset, rows = result
+        if source is not self.source:
+            return
+
+        if total is not None:
+            self.total = total
+            self.offset = offset
+            self._needs_count = False
+
+        self.tree_sync.sync([self.format_row(row) for row in rows])
+
+        # Re-select the user's rows when they scroll back into view
+        visible = tuple(iid for iid in self.selected if iid in self.tree_sync.rows)
+        if visible and visible != self.tree.selection():
+            self.tree.selection_set(visible)
+
+        if self._select_after is not None:
+            children = self.tree.get_children()
+            if children:
+                self._select(children[0 if self._select_after == "first" else -1])
+            self._select_after = None
+
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        if self.total <= self.visible_rows:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(
+                self.offset / self.total,
+                (self.offset + self.visible_rows) / self.total,
+            )
+
+    def _on_select(self, _event=None):
+        # Scrolling the selected row out of view empties the selection,
+        # which should not count as the user deselecting it
+        selection = self.tree.selection()
+        if selection:
+            self.selected = selection
+
+    def _on_configure(self, event):
+        rowheight = 25
+        header = rowheight
+
+        children = self.tree.get_children()
+        if children:
+            bbox = self.tree.bbox(children[0])
+            if bbox:
+                header, rowheight = bbox[1], bbox[3]
+
+        visible_rows = max(1, (event.height - header) // rowheight)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self._load()
+
+    def _on_mousewheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.yview("scroll", -3, "units")
+        else:
+            self.yview("scroll", 3, "units")
+
+        return "break"
+
+    def _on_key_up(self, _event):
+        focus = self.tree.focus()
+        children = self.tree.get_children()
+        if children and focus == children[0] and self.offset > 0:
+            self._select_after = "first"
+            self.yview("scroll", -1, "units")
+            return "break"
+
+    def _on_key_down(self, _event):
+        focus = self.tree.focus()
+        children = self.tree.get_children()
+        if (
+            children
+            and focus == children[-1]
+            and self.offset + self.visible_rows < self.total
+        ):
+            self._select_after = "last"
+            self.yview("scroll", 1, "units")
+            return "break"
+
+    def _select(self, iid):
+        self.tree.focus(iid)
+        self.tree.selection_set(iid)
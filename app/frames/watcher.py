@@ -0,0 +1,49 @@
+from app.models.changes import tracker
+
+# How often a visible frame looks for other terminals' edits, None to only
+# check when the frame is shown or asked to refresh
+POLL_INTERVAL_MS = 2000
+
+
+class ChangeWatcher:
+    """Reload the parts of a frame whose tables changed
+
+    handlers is a list of (tables, handler) pairs, where handler reloads
+    whatever the frame shows from those tables. check() only calls the
+    handlers whose tables changed since the previous check, so it is cheap
+    enough to run every time the frame is shown and, while it is visible,
+    every interval milliseconds.
+    """
+
+    def __init__(self, widget, handlers, interval=POLL_INTERVAL_MS):
+        self.widget = widget
+        self.handlers = handlers
+        self.interval = interval
+
+        # Taken before the frame's first load, so nothing written during it
+        # is missed
+        self.seen = tracker.poll()
+
+        self.widget.bind("<Map>", lambda _event: self.check(), add="+")
+        if self.interval is not None:
+            self.widget.after(self.interval, self._tick)
+
+    def check(self):
+        """Call the handlers of the tables that changed since the last check"""
+        seen = self.seen
+        self.seen = tracker.poll()
+
+        called = []
+        for tables, handler in self.handlers:
+            if handler not in called and any(
+                self.seen.get(table) != seen.get(table) for table in tables
+            ):
+                called.append(handler)
+                handler()
+
+    def _tick(self):
+        try:
+            if self.widget.winfo_ismapped():
+                self.check()
+        finally:
+            self.widget.after(self.interval, self._tick)
@@ -0,0 +1,52 @@
+class WriteRunner:
+    """Run a frame's model writes on the loader and report how they went
+
+    A write can wait seconds for another terminal to release the database
+    lock, or behind a CSV import on the writer, so it doesn't run on the Tk
+    main loop. The frame's write buttons are disabled until it finishes.
+
+    Model writes return True when saved, False when refused (the failure
+    message explains why) and None when the database stayed busy.
+    """
+
+    def __init__(self, loader, buttons, on_saved):
+        self.loader = loader
+        self.buttons = buttons
+        self.on_saved = on_saved  # called after every successful write
+
+    def run(self, title, failure, func, *args, on_error=None):
+        """Run func(*args) in the background, on_error(exception) if it raises"""
+        self.set_busy(True)
+        self.loader.submit(
+            "write",
+            func,
+            lambda result: self.show_result(title, failure, result),
+            *args,
+            on_error=lambda error: self.show_error(title, error, on_error),
+            write=True,
+        )
+
+    def set_busy(self, busy):
+        state = "disabled" if busy else "normal"
+        for button in self.buttons:
+            button.configure(state=state)
+
+    def show_result(self, title, failure, result):
+        from tkinter import messagebox
+
+        self.set_busy(False)
+        if result:
+            self.on_saved()
+        elif result is None:
+            messagebox.showerror(title, "The database is busy, please try again")
+        else:
+            messagebox.showerror(title, failure)
+
+    def show_error(self, title, error, on_error):
+        from tkinter import messagebox
+
+        self.set_busy(False)
+        if on_error is not None:
+            on_error(error)
+        else:
+            messagebox.showerror(title, str(error))
@@ -0,0 +1,71 @@
+import os
+
+from PIL import Image
+
+IMAGE_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "test_images")
+CACHE_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "icon_cache")
+
+# Icons are cached at twice their display size so they stay sharp when
+# customtkinter scales the UI up on high DPI screens
+CACHE_SCALE = 2
+
+# Every icon the navigation uses, with the size it is displayed at
+ICONS = {
+    "CustomTkinter_logo_single.png": (26, 26),
+    "home_light.png": (20, 20),
+    "image_icon_light.png": (20, 20),
+    "chat_light.png": (20, 20),
+    "add_user_light.png": (20, 20),
+}
+
+
+def _cache_file(filename, size):
+    name, _ = os.path.splitext(filename)
+    width, height = size
+    return os.path.join(CACHE_PATH, f"{name}_{width}x{height}@{CACHE_SCALE}x.png")
+
+
+def build_icon(filename, size):
+    """Scale the source image down once and store it in the icon cache"""
+    source = os.path.join(IMAGE_PATH, filename)
+    cached = _cache_file(filename, size)
+
+    with Image.open(source) as image:
+        image = image.convert("RGBA")
+        image.thumbnail(
+            (size[0] * CACHE_SCALE, size[1] * CACHE_SCALE), Image.Resampling.LANCZOS
+        )
+
+    os.makedirs(CACHE_PATH, exist_ok=True)
+
+    # Write to a temporary name first so another terminal never reads half a file
+    temporary = f"{cached}.{os.getpid()}.tmp"
+    image.save(temporary, optimize=True)
+    os.replace(temporary, cached)
+
+    return cached
+
+
+def load_icon(filename, size):
+    """Return a small pre-scaled copy of an icon, building the cache if needed"""
+    source = os.path.join(IMAGE_PATH, filename)
+    cached = _cache_file(filename, size)
+
+    try:
+        fresh = os.path.getmtime(cached) >= os.path.getmtime(source)
+    except OSError:
+        fresh = False
+
+    if not fresh:
+        try:
+            cached = build_icon(filename, size)
+        except OSError:
+            # Read-only install, fall back to the full size image
+            return Image.open(source)
+
+    return Image.open(cached)
+
+
+if __name__ == "__main__":
+    for filename, size in ICONS.items():
+        print(build_icon(filename, size))
@@ -0,0 +1,15 @@
+-- Indexes for the hot read paths. suppliers.company_name already has the
+-- implicit index from its UNIQUE constraint, which covers the supplier
+-- lookup in Products.add_product.
+
+-- Sales.get_all_sales joins sales to products on product_id
+CREATE INDEX IF NOT EXISTS idx_sales_product_id ON sales(product_id);
+
+-- Date range reports over sales
+CREATE INDEX IF NOT EXISTS idx_sales_sale_date ON sales(sale_date);
+
+-- Products per supplier
+CREATE INDEX IF NOT EXISTS idx_products_supplier_id ON products(supplier_id);
+
+-- Products.get_low_stock_products filters and sorts on stock
+CREATE INDEX IF NOT EXISTS idx_products_stock ON products(stock);
@@ -0,0 +1,60 @@
+-- Full-text search indexes for the search boxes. Both are external content
+-- tables, so the text lives only once in products/suppliers and the
+-- triggers below keep the index in step with every write.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+    product_name,
+    supplier_name,
+    content='products',
+    content_rowid='product_id',
+    prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+    INSERT INTO products_fts(rowid, product_name, supplier_name)
+    VALUES (new.product_id, new.product_name, new.supplier_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+    INSERT INTO products_fts(products_fts, rowid, product_name, supplier_name)
+    VALUES ('delete', old.product_id, old.product_name, old.supplier_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_fts_update
+AFTER UPDATE OF product_name, supplier_name ON products BEGIN
+    INSERT INTO products_fts(products_fts, rowid, product_name, supplier_name)
+    VALUES ('delete', old.product_id, old.product_name, old.supplier_name);
+    INSERT INTO products_fts(rowid, product_name, supplier_name)
+    VALUES (new.product_id, new.product_name, new.supplier_name);
+END;
+
+INSERT INTO products_fts(products_fts) VALUES ('rebuild');
+
+CREATE VIRTUAL TABLE IF NOT EXISTS suppliers_fts USING fts5(
+    company_name,
+    supplier_name,
+    email,
+    phone,
+    content='suppliers',
+    content_rowid='supplier_id',
+    prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS suppliers_fts_insert AFTER INSERT ON suppliers BEGIN
+    INSERT INTO suppliers_fts(rowid, company_name, supplier_name, email, phone)
+    VALUES (new.supplier_id, new.company_name, new.supplier_name, new.email, new.phone);
+END;
+
+CREATE TRIGGER IF NOT EXISTS suppliers_fts_delete AFTER DELETE ON suppliers BEGIN
+    INSERT INTO suppliers_fts(suppliers_fts, rowid, company_name, supplier_name, email, phone)
+    VALUES ('delete', old.supplier_id, old.company_name, old.supplier_name, old.email, old.phone);
+END;
+
+CREATE TRIGGER IF NOT EXISTS suppliers_fts_update AFTER UPDATE ON suppliers BEGIN
+    INSERT INTO suppliers_fts(suppliers_fts, rowid, company_name, supplier_name, email, phone)
+    VALUES ('delete', old.supplier_id, old.company_name, old.supplier_name, old.email, old.phone);
+    INSERT INTO suppliers_fts(rowid, company_name, supplier_name, email, phone)
+    VALUES (new.supplier_id, new.company_name, new.supplier_name, new.email, new.phone);
+END;
+
+INSERT INTO suppliers_fts(suppliers_fts) VALUES ('rebuild');
@@ -0,0 +1,28 @@
+-- sales used to hold one running product_sold counter per product. It
+-- becomes an append-only ledger with one row per sale. Existing non-zero
+-- counters are carried over as a single sale each, priced at the
+-- product's current price.
+
+CREATE TABLE sales_ledger (
+    sale_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL CHECK (quantity > 0),
+    unit_price DECIMAL(10,2) NOT NULL,
+    sale_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (product_id) REFERENCES products(product_id) ON DELETE CASCADE
+);
+
+INSERT INTO sales_ledger (product_id, quantity, unit_price, sale_date)
+SELECT sales.product_id, sales.product_sold, products.price, sales.sale_date
+FROM sales
+JOIN products ON products.product_id = sales.product_id
+WHERE sales.product_sold > 0
+ORDER BY sales.sale_id;
+
+DROP TABLE sales;
+
+ALTER TABLE sales_ledger RENAME TO sales;
+
+CREATE INDEX idx_sales_product_id ON sales(product_id);
+
+CREATE INDEX idx_sales_sale_date ON sales(sale_date);
@@ -0,0 +1,96 @@
+-- Time bucketed sales totals, kept current by triggers on the sales
+-- ledger so range reports read one row per bucket instead of every sale.
+-- Weeks start on Monday.
+
+CREATE TABLE sales_daily (
+    product_id INTEGER NOT NULL,
+    sale_day DATE NOT NULL,
+    quantity INTEGER NOT NULL,
+    revenue DECIMAL(10,2) NOT NULL,
+    sale_count INTEGER NOT NULL,
+    PRIMARY KEY (product_id, sale_day)
+) WITHOUT ROWID;
+
+CREATE INDEX idx_sales_daily_sale_day ON sales_daily(sale_day);
+
+CREATE TABLE supplier_sales_weekly (
+    supplier_id INTEGER NOT NULL,
+    week_start DATE NOT NULL,
+    quantity INTEGER NOT NULL,
+    revenue DECIMAL(10,2) NOT NULL,
+    sale_count INTEGER NOT NULL,
+    PRIMARY KEY (supplier_id, week_start)
+) WITHOUT ROWID;
+
+CREATE INDEX idx_supplier_sales_weekly_week_start ON supplier_sales_weekly(week_start);
+
+CREATE TRIGGER sales_rollup_insert AFTER INSERT ON sales BEGIN
+    INSERT INTO sales_daily (product_id, sale_day, quantity, revenue, sale_count)
+    VALUES (
+        new.product_id,
+        date(new.sale_date),
+        new.quantity,
+        new.quantity * new.unit_price,
+        1
+    )
+    ON CONFLICT (product_id, sale_day) DO UPDATE SET
+        quantity = quantity + excluded.quantity,
+        revenue = revenue + excluded.revenue,
+        sale_count = sale_count + 1;
+
+    INSERT INTO supplier_sales_weekly (supplier_id, week_start, quantity, revenue, sale_count)
+    SELECT
+        supplier_id,
+        date(new.sale_date, 'weekday 0', '-6 days'),
+        new.quantity,
+        new.quantity * new.unit_price,
+        1
+    FROM products
+    WHERE product_id = new.product_id
+    ON CONFLICT (supplier_id, week_start) DO UPDATE SET
+        quantity = quantity + excluded.quantity,
+        revenue = revenue + excluded.revenue,
+        sale_count = sale_count + 1;
+END;
+
+-- Sales are only deleted together with their product
+CREATE TRIGGER sales_rollup_delete AFTER DELETE ON sales BEGIN
+    UPDATE sales_daily SET
+        quantity = quantity - old.quantity,
+        revenue = revenue - old.quantity * old.unit_price,
+        sale_count = sale_count - 1
+    WHERE product_id = old.product_id AND sale_day = date(old.sale_date);
+
+    DELETE FROM sales_daily
+    WHERE product_id = old.product_id
+        AND sale_day = date(old.sale_date)
+        AND sale_count = 0;
+
+    UPDATE supplier_sales_weekly SET
+        quantity = quantity - old.quantity,
+        revenue = revenue - old.quantity * old.unit_price,
+        sale_count = sale_count - 1
+    WHERE supplier_id = (SELECT supplier_id FROM products WHERE product_id = old.product_id)
+        AND week_start = date(old.sale_date, 'weekday 0', '-6 days');
+
+    DELETE FROM supplier_sales_weekly
+    WHERE supplier_id = (SELECT supplier_id FROM products WHERE product_id = old.product_id)
+        AND week_start = date(old.sale_date, 'weekday 0', '-6 days')
+        AND sale_count = 0;
+END;
+
+INSERT INTO sales_daily (product_id, sale_day, quantity, revenue, sale_count)
+SELECT product_id, date(sale_date), SUM(quantity), SUM(quantity * unit_price), COUNT(*)
+FROM sales
+GROUP BY product_id, date(sale_date);
+
+INSERT INTO supplier_sales_weekly (supplier_id, week_start, quantity, revenue, sale_count)
+SELECT
+    products.supplier_id,
+    date(sales.sale_date, 'weekday 0', '-6 days'),
+    SUM(sales.quantity),
+    SUM(sales.quantity * sales.unit_price),
+    COUNT(*)
+FROM sales
+JOIN products ON products.product_id = sales.product_id
+GROUP BY products.supplier_id, date(sales.sale_date, 'weekday 0', '-6 days');
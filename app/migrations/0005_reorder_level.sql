@@ -0,0 +1,9 @@
+-- Per product reorder threshold. A product needs restocking once its
+-- stock falls to or below its reorder level.
+
+ALTER TABLE products ADD COLUMN reorder_level INTEGER NOT NULL DEFAULT 10;
+
+-- Only products that need restocking are indexed, so the alerts queries
+-- read the handful of low rows instead of scanning every product.
+CREATE INDEX idx_products_low_stock ON products(stock, product_id)
+WHERE stock <= reorder_level;
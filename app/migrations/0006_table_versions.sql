@@ -0,0 +1,59 @@
+-- A change counter per table, bumped by triggers on every write so the
+-- app can tell which tables another connection or process changed without
+-- re-reading them.
+
+CREATE TABLE table_versions (
+    table_name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+INSERT INTO table_versions (table_name)
+VALUES ('products'), ('suppliers'), ('sales'), ('customers');
+
+CREATE TRIGGER products_version_insert AFTER INSERT ON products BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'products';
+END;
+
+CREATE TRIGGER products_version_update AFTER UPDATE ON products BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'products';
+END;
+
+CREATE TRIGGER products_version_delete AFTER DELETE ON products BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'products';
+END;
+
+CREATE TRIGGER suppliers_version_insert AFTER INSERT ON suppliers BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'suppliers';
+END;
+
+CREATE TRIGGER suppliers_version_update AFTER UPDATE ON suppliers BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'suppliers';
+END;
+
+CREATE TRIGGER suppliers_version_delete AFTER DELETE ON suppliers BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'suppliers';
+END;
+
+CREATE TRIGGER sales_version_insert AFTER INSERT ON sales BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'sales';
+END;
+
+CREATE TRIGGER sales_version_update AFTER UPDATE ON sales BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'sales';
+END;
+
+CREATE TRIGGER sales_version_delete AFTER DELETE ON sales BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'sales';
+END;
+
+CREATE TRIGGER customers_version_insert AFTER INSERT ON customers BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'customers';
+END;
+
+CREATE TRIGGER customers_version_update AFTER UPDATE ON customers BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'customers';
+END;
+
+CREATE TRIGGER customers_version_delete AFTER DELETE ON customers BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'customers';
+END;
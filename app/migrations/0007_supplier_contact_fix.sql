@@ -0,0 +1,6 @@
+-- The suppliers tab used to pass the email as the supplier name and the
+-- supplier name as the email, so swap them back wherever that happened.
+
+UPDATE suppliers
+SET supplier_name = email, email = supplier_name
+WHERE supplier_name LIKE '%@%' AND email NOT LIKE '%@%';
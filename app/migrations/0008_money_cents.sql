@@ -0,0 +1,77 @@
+-- Money is stored as integer cents instead of DECIMAL, which SQLite keeps
+-- as a float, so prices, totals and sums are exact.
+
+-- The rollup triggers read sales.unit_price, recreated below
+DROP TRIGGER sales_rollup_insert;
+DROP TRIGGER sales_rollup_delete;
+
+ALTER TABLE products ADD COLUMN price_cents INTEGER NOT NULL DEFAULT 0;
+UPDATE products SET price_cents = CAST(round(price * 100) AS INTEGER);
+ALTER TABLE products DROP COLUMN price;
+
+ALTER TABLE sales ADD COLUMN unit_price_cents INTEGER NOT NULL DEFAULT 0;
+UPDATE sales SET unit_price_cents = CAST(round(unit_price * 100) AS INTEGER);
+ALTER TABLE sales DROP COLUMN unit_price;
+
+ALTER TABLE sales_daily ADD COLUMN revenue_cents INTEGER NOT NULL DEFAULT 0;
+UPDATE sales_daily SET revenue_cents = CAST(round(revenue * 100) AS INTEGER);
+ALTER TABLE sales_daily DROP COLUMN revenue;
+
+ALTER TABLE supplier_sales_weekly ADD COLUMN revenue_cents INTEGER NOT NULL DEFAULT 0;
+UPDATE supplier_sales_weekly SET revenue_cents = CAST(round(revenue * 100) AS INTEGER);
+ALTER TABLE supplier_sales_weekly DROP COLUMN revenue;
+
+CREATE TRIGGER sales_rollup_insert AFTER INSERT ON sales BEGIN
+    INSERT INTO sales_daily (product_id, sale_day, quantity, revenue_cents, sale_count)
+    VALUES (
+        new.product_id,
+        date(new.sale_date),
+        new.quantity,
+        new.quantity * new.unit_price_cents,
+        1
+    )
+    ON CONFLICT (product_id, sale_day) DO UPDATE SET
+        quantity = quantity + excluded.quantity,
+        revenue_cents = revenue_cents + excluded.revenue_cents,
+        sale_count = sale_count + 1;
+
+    INSERT INTO supplier_sales_weekly (supplier_id, week_start, quantity, revenue_cents, sale_count)
+    SELECT
+        supplier_id,
+        date(new.sale_date, 'weekday 0', '-6 days'),
+        new.quantity,
+        new.quantity * new.unit_price_cents,
+        1
+    FROM products
+    WHERE product_id = new.product_id
+    ON CONFLICT (supplier_id, week_start) DO UPDATE SET
+        quantity = quantity + excluded.quantity,
+        revenue_cents = revenue_cents + excluded.revenue_cents,
+        sale_count = sale_count + 1;
+END;
+
+-- Sales are only deleted together with their product
+CREATE TRIGGER sales_rollup_delete AFTER DELETE ON sales BEGIN
+    UPDATE sales_daily SET
+        quantity = quantity - old.quantity,
+        revenue_cents = revenue_cents - old.quantity * old.unit_price_cents,
+        sale_count = sale_count - 1
+    WHERE product_id = old.product_id AND sale_day = date(old.sale_date);
+
+    DELETE FROM sales_daily
+    WHERE product_id = old.product_id
+        AND sale_day = date(old.sale_date)
+        AND sale_count = 0;
+
+    UPDATE supplier_sales_weekly SET
+        quantity = quantity - old.quantity,
+        revenue_cents = revenue_cents - old.quantity * old.unit_price_cents,
+        sale_count = sale_count - 1
+    WHERE supplier_id = (SELECT supplier_id FROM products WHERE product_id = old.product_id)
+        AND week_start = date(old.sale_date, 'weekday 0', '-6 days');
+
+    DELETE FROM supplier_sales_weekly
+    WHERE supplier_id = (SELECT supplier_id FROM products WHERE product_id = old.product_id)
+        AND week_start = date(old.sale_date, 'weekday 0', '-6 days')
+        AND sale_count = 0;
+END;
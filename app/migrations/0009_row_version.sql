@@ -0,0 +1,13 @@
+-- Bumped on every change to a product, so an edit based on a copy of the
+-- row read before someone else changed it is caught instead of silently
+-- overwriting their change.
+
+ALTER TABLE products ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0;
+
+-- Statements that set row_version themselves are left alone
+CREATE TRIGGER products_row_version AFTER UPDATE ON products
+WHEN new.row_version = old.row_version
+BEGIN
+    UPDATE products SET row_version = old.row_version + 1
+    WHERE product_id = new.product_id;
+END;
@@ -0,0 +1,88 @@
+-- Bucket the sales rollups by local day instead of UTC. sale_date is
+-- stored in UTC (CURRENT_TIMESTAMP), so date(sale_date) put an evening
+-- sale on the next day. The day comes from the time zone of the process
+-- recording or deleting the sale, so terminals sharing a database must run
+-- in the same one.
+
+DROP TRIGGER sales_rollup_insert;
+DROP TRIGGER sales_rollup_delete;
+
+CREATE TRIGGER sales_rollup_insert AFTER INSERT ON sales BEGIN
+    INSERT INTO sales_daily (product_id, sale_day, quantity, revenue_cents, sale_count)
+    VALUES (
+        new.product_id,
+        date(new.sale_date, 'localtime'),
+        new.quantity,
+        new.quantity * new.unit_price_cents,
+        1
+    )
+    ON CONFLICT (product_id, sale_day) DO UPDATE SET
+        quantity = quantity + excluded.quantity,
+        revenue_cents = revenue_cents + excluded.revenue_cents,
+        sale_count = sale_count + 1;
+
+    INSERT INTO supplier_sales_weekly (supplier_id, week_start, quantity, revenue_cents, sale_count)
+    SELECT
+        supplier_id,
+        date(new.sale_date, 'localtime', 'weekday 0', '-6 days'),
+        new.quantity,
+        new.quantity * new.unit_price_cents,
+        1
+    FROM products
+    WHERE product_id = new.product_id
+    ON CONFLICT (supplier_id, week_start) DO UPDATE SET
+        quantity = quantity + excluded.quantity,
+        revenue_cents = revenue_cents + excluded.revenue_cents,
+        sale_count = sale_count + 1;
+END;
+
+-- Sales are only deleted together with their product
+CREATE TRIGGER sales_rollup_delete AFTER DELETE ON sales BEGIN
+    UPDATE sales_daily SET
+        quantity = quantity - old.quantity,
+        revenue_cents = revenue_cents - old.quantity * old.unit_price_cents,
+        sale_count = sale_count - 1
+    WHERE product_id = old.product_id AND sale_day = date(old.sale_date, 'localtime');
+
+    DELETE FROM sales_daily
+    WHERE product_id = old.product_id
+        AND sale_day = date(old.sale_date, 'localtime')
+        AND sale_count = 0;
+
+    UPDATE supplier_sales_weekly SET
+        quantity = quantity - old.quantity,
+        revenue_cents = revenue_cents - old.quantity * old.unit_price_cents,
+        sale_count = sale_count - 1
+    WHERE supplier_id = (SELECT supplier_id FROM products WHERE product_id = old.product_id)
+        AND week_start = date(old.sale_date, 'localtime', 'weekday 0', '-6 days');
+
+    DELETE FROM supplier_sales_weekly
+    WHERE supplier_id = (SELECT supplier_id FROM products WHERE product_id = old.product_id)
+        AND week_start = date(old.sale_date, 'localtime', 'weekday 0', '-6 days')
+        AND sale_count = 0;
+END;
+
+-- Rebuild the existing buckets on local days
+DELETE FROM sales_daily;
+DELETE FROM supplier_sales_weekly;
+
+INSERT INTO sales_daily (product_id, sale_day, quantity, revenue_cents, sale_count)
+SELECT
+    product_id,
+    date(sale_date, 'localtime'),
+    SUM(quantity),
+    SUM(quantity * unit_price_cents),
+    COUNT(*)
+FROM sales
+GROUP BY product_id, date(sale_date, 'localtime');
+
+INSERT INTO supplier_sales_weekly (supplier_id, week_start, quantity, revenue_cents, sale_count)
+SELECT
+    products.supplier_id,
+    date(sales.sale_date, 'localtime', 'weekday 0', '-6 days'),
+    SUM(sales.quantity),
+    SUM(sales.quantity * sales.unit_price_cents),
+    COUNT(*)
+FROM sales
+JOIN products ON products.product_id = sales.product_id
+GROUP BY products.supplier_id, date(sales.sale_date, 'localtime', 'weekday 0', '-6 days');
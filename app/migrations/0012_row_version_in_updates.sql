@@ -0,0 +1,4 @@
+-- The model UPDATEs now bump row_version themselves. The trigger wrote
+-- every changed product a second time, on every sale's stock decrement.
+
+DROP TRIGGER products_row_version;
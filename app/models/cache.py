@@ -0,0 +1,151 @@
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+
+from app.writer import writer
+
+CACHE_SIZE = 256
+
+
+class QueryCache:
+    """Bounded LRU cache of model query results
+
+    Every entry is tagged with the tables its query reads. Writing a table
+    drops every entry tagged with it, and bumps the table's version so a
+    query that was already running during the write doesn't store its
+    (possibly stale) result afterwards.
+    """
+
+    def __init__(self, max_size=CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()  # key -> (tables, result)
+        self.versions = {}  # table -> number of writes seen
+        self.generation = 0  # number of clear() calls
+        self.lock = threading.Lock()
+
+    def get(self, key, tables, load):
+        """Return the cached result for key, calling load() on a miss"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                return entry[1]
+
+            versions = self._versions(tables)
+
+        result = load()
+
+        # None means the query failed, try again next time
+        if result is None:
+            return result
+
+        with self.lock:
+            if versions == self._versions(tables):
+                self.entries[key] = (tables, result)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+
+        return result
+
+    def invalidate(self, *tables):
+        """Drop every cached result that read any of the given tables"""
+        with self.lock:
+            for table in tables:
+                self.versions[table] = self.versions.get(table, 0) + 1
+
+            stale = [
+                key
+                for key, (entry_tables, _) in self.entries.items()
+                if not entry_tables.isdisjoint(tables)
+            ]
+            for key in stale:
+                del self.entries[key]
+
+    def clear(self):
+        """Drop every cached result"""
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+    def _versions(self, tables):
+        return [self.generation] + [self.versions.get(table, 0) for table in tables]
+
+
+# Shared by every model instance, the models themselves hold no state
+query_cache = QueryCache()
+
+
+def reads(method):
+    """Run a read method within the calling thread's unit of work, if one is open
+
+    Only the writer's connection sees the unit of work's uncommitted writes,
+    so the read runs there. A streaming read is read in full.
+    """
+    stream = inspect.isgeneratorfunction(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        tx = writer.current_transaction()
+        if tx is None:
+            return method(self, *args, **kwargs)
+
+        if stream:
+            return tx.run(lambda conn: list(method(self, *args, **kwargs)))
+
+        return tx.run(lambda conn: method(self, *args, **kwargs))
+
+    return wrapper
+
+
+def cached(*tables):
+    """Cache a read method's results by argument until one of tables is written"""
+    tables = frozenset(tables)
+
+    def decorator(method):
+        read = reads(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            # Reads that may see writes not committed yet are not cached
+            if (
+                writer.current_transaction() is not None
+                or threading.current_thread() is writer.thread
+            ):
+                return read(self, *args, **kwargs)
+
+            key = (method.__qualname__, args, tuple(sorted(kwargs.items())))
+            result = query_cache.get(key, tables, lambda: method(self, *args, **kwargs))
+
+            # Callers get their own list so they can't change the cached one
+            if isinstance(result, list):
+                return list(result)
+
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def invalidates(*tables):
+    """Drop cached results that read tables whenever a model write method runs"""
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                query_cache.invalidate(*tables)
+
+                # Inside a unit of work the write only lands at its commit,
+                # so drop whatever was cached in between once more then
+                tx = kwargs.get("tx") or writer.current_transaction()
+                if tx is not None:
+                    tx.call_after(query_cache.invalidate, *tables)
+
+        return wrapper
+
+    return decorator
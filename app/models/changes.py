@@ -0,0 +1,61 @@
+import logging
+import sqlite3
+
+from app.db import open_connection
+from app.models.cache import query_cache
+
+
+class ChangeTracker:
+    """Tell which tables were written since the caller last looked
+
+    Triggers bump a per-table counter in table_versions on every insert,
+    update and delete. PRAGMA data_version on a connection of our own moves
+    whenever any other connection commits, in this process or another one,
+    so polling costs a single pragma until something was actually written.
+    Tables found changed are dropped from the query cache, which covers
+    writes made by other processes.
+
+    The connection belongs to the thread that first polls, the Tk main loop.
+    """
+
+    def __init__(self):
+        self.conn = None
+        self.data_version = None
+        self.versions = {}  # table -> change counter
+
+    def poll(self):
+        """Return the change counter of every tracked table"""
+        try:
+            if self.conn is None:
+                self.conn = open_connection()
+
+            data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self.data_version:
+                return self.versions
+
+            versions = dict(
+                self.conn.execute("SELECT table_name, version FROM table_versions")
+            )
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Error: {e}")
+            return self.versions
+
+        changed = [
+            table for table, version in versions.items()
+            if self.versions.get(table) != version
+        ]
+        if self.data_version is not None and changed:
+            query_cache.invalidate(*changed)
+
+        self.data_version = data_version
+        self.versions = versions
+        return versions
+
+    def changed_since(self, versions, tables):
+        """Return whether any of tables changed since versions, an earlier poll()"""
+        current = self.poll()
+        return any(current.get(table) != versions.get(table) for table in tables)
+
+
+# Shared by every frame
+tracker = ChangeTracker()
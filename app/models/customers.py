@@ -1,30 +1,58 @@
 import logging
 import sqlite3
 
-from app.db import get_db_connection
+from app.db import FETCH_BATCH_SIZE, get_db_connection, iter_query, keyset_query
+from app.models.cache import reads
+from app.models.records import Customer, record_factory
+from app.writer import writer
+
+as_customer = record_factory(Customer)
 
 
 class Customers:
-    def get_all_customers(self):
-        query = "SELECT * FROM customers"
+    # Columns iter_customers can order by
+    ORDER_KEYS = ("customer_id", "customer_name")
 
+    @reads
+    def get_all_customers(self):
         try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query)
-                customers = cursor.fetchall()
-
-                return customers
+            return list(self.iter_customers())
         except sqlite3.DatabaseError as e:
             logging.error(f"Error: {e}")
             return None
 
+    @reads
+    def iter_customers(
+        self,
+        after_id=None,
+        limit=None,
+        order_by="customer_id",
+        batch_size=FETCH_BATCH_SIZE,
+        after_value=None,
+    ):
+        """Stream customers ordered by order_by, resuming after customer after_id"""
+        if order_by not in self.ORDER_KEYS:
+            raise ValueError(f"Cannot order customers by {order_by}")
+
+        query, params = keyset_query(
+            "customer_id, customer_name",
+            "customers",
+            "customer_id",
+            order_by,
+            after_id,
+            limit,
+            after_value,
+        )
+        yield from iter_query(query, params, batch_size, as_customer)
+
+    @reads
     def get_customer_by_id(self, customer_id):
-        query = "SELECT * FROM customers WHERE id = ?"
+        query = "SELECT customer_id, customer_name FROM customers WHERE customer_id = ?"
 
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = as_customer
                 cursor.execute(query, (customer_id,))
                 customer = cursor.fetchone()
 
@@ -33,16 +61,9 @@ class Customers:
             logging.error(f"Error: {e}")
             return None
 
-    def add_customer(self, customer_name):
-        query = "INSERT INTO customers (name) VALUES (?)"
-
+    def add_customer(self, customer_name, tx=None):
         try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, (customer_name,))
-                conn.commit()
-
-                return True
+            return (tx or writer).run(self._add_customer, customer_name)
         except sqlite3.IntegrityError as f:
             logging.error(f"Error: {f}")
             return False
@@ -51,30 +72,36 @@ class Customers:
             logging.error(f"Error: {e}")
             return False
 
-    def edit_customer(self, customer_id, customer_name):
-        query = "UPDATE customers SET name = ? WHERE id = ?"
+    def _add_customer(self, conn, customer_name):
+        query = "INSERT INTO customers (customer_name) VALUES (?)"
 
-        try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, (customer_name, customer_id))
-                conn.commit()
+        conn.execute(query, (customer_name,))
+        return True
 
-                return True
+    def edit_customer(self, customer_id, customer_name, tx=None):
+        try:
+            return (tx or writer).run(
+                self._edit_customer, customer_id, customer_name
+            )
         except sqlite3.DatabaseError as e:
             logging.error(f"Error: {e}")
             return False
 
-    def delete_customer(self, customer_id):
-        query = "DELETE FROM customers WHERE id = ?"
+    def _edit_customer(self, conn, customer_id, customer_name):
+        query = "UPDATE customers SET customer_name = ? WHERE customer_id = ?"
 
-        try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, (customer_id,))
-                conn.commit()
+        conn.execute(query, (customer_name, customer_id))
+        return True
 
-                return True
+    def delete_customer(self, customer_id, tx=None):
+        try:
+            return (tx or writer).run(self._delete_customer, customer_id)
         except sqlite3.DatabaseError as e:
             logging.error(f"Error: {e}")
             return False
+
+    def _delete_customer(self, conn, customer_id):
+        query = "DELETE FROM customers WHERE customer_id = ?"
+
+        conn.execute(query, (customer_id,))
+        return True
@@ -1,17 +1,117 @@
+import csv
 import logging
 import sqlite3
 
-from app.db import get_db_connection
+from app.db import (
+    FETCH_BATCH_SIZE,
+    IMPORT_BATCH_SIZE,
+    MAX_INTEGER,
+    ConflictError,
+    fts_query,
+    get_db_connection,
+    iter_query,
+    keyset_query,
+)
+from app.models.cache import cached, invalidates, reads
+from app.models.records import Product, record_factory
+from app.money import to_cents
+from app.writer import writer
+
+
+# Low stock products need restocking; their severity is "out" with nothing
+# left, "critical" at or below half the reorder level, otherwise "low".
+LOW_STOCK = "products.stock <= products.reorder_level"
+SEVERITY = """
+    CASE
+        WHEN products.stock <= 0 THEN 'out'
+        WHEN products.stock * 2 <= products.reorder_level THEN 'critical'
+        ELSE 'low'
+    END AS severity
+"""
+
+# What the product lists show, the full row is only read by ID. The line
+# total and the DD/MM/YYYY date are worked out here instead of per row in
+# the UI; a date SQLite can't parse is shown as stored.
+COLUMNS = """
+    products.product_id,
+    products.product_name,
+    products.price_cents,
+    products.stock,
+    products.supplier_name,
+    products.price_cents * products.stock AS total_cents,
+    COALESCE(strftime('%d/%m/%Y', products.last_updated), products.last_updated) AS updated_on,
+    products.row_version
+"""
+LOW_STOCK_COLUMNS = f"""
+    products.product_id,
+    products.product_name,
+    products.stock,
+    products.supplier_name,
+    products.reorder_level,
+    {SEVERITY}
+"""
+
+as_product = record_factory(Product)
+
+
+def field_text(record, name):
+    """Return an import field as stripped text, records from code may hold numbers"""
+    value = record.get(name)
+    return "" if value is None else str(value).strip()
 
 
 class Products:
+    # Columns iter_products can order by
+    ORDER_KEYS = (
+        "product_id",
+        "product_name",
+        "stock",
+        "price_cents",
+        "last_updated",
+    )
+    DEFAULT_REORDER_LEVEL = 10
+
+    @cached("products")
     def get_low_stock_products(self):
-        query = "SELECT * FROM products WHERE stock < 10 ORDER BY stock DESC"
+        """Return products that need restocking, most urgent first, with their severity"""
+        query = f"SELECT {LOW_STOCK_COLUMNS} FROM products WHERE {LOW_STOCK} ORDER BY products.stock, products.product_id"
+
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = as_product
+                cursor.execute(query)
+                products = cursor.fetchall()
+
+                return products
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Error: {e}")
+            return None
+
+    @cached("products")
+    def count_low_stock_products(self):
+        query = f"SELECT COUNT(*) FROM products WHERE {LOW_STOCK}"
 
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(query)
+                count = cursor.fetchone()[0]
+
+                return count
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Error: {e}")
+            return None
+
+    def get_low_stock_window(self, offset, limit):
+        """Return one screenful of low stock products"""
+        query = f"SELECT {LOW_STOCK_COLUMNS} FROM products WHERE {LOW_STOCK} ORDER BY products.stock, products.product_id LIMIT ? OFFSET ?"
+
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = as_product
+                cursor.execute(query, (limit, offset))
                 products = cursor.fetchall()
 
                 return products
@@ -19,26 +119,193 @@ class Products:
             logging.error(f"Error: {e}")
             return None
 
+    @cached("products")
     def get_all_products(self):
-        query = "SELECT * FROM products"
+        try:
+            return list(self.iter_products())
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Error: {e}")
+            return None
+
+    @reads
+    def iter_products(
+        self,
+        after_id=None,
+        limit=None,
+        order_by="product_id",
+        batch_size=FETCH_BATCH_SIZE,
+        after_value=None,
+    ):
+        """Stream products ordered by order_by, resuming after product after_id"""
+        if order_by not in self.ORDER_KEYS:
+            raise ValueError(f"Cannot order products by {order_by}")
+
+        query, params = keyset_query(
+            COLUMNS, "products", "product_id", order_by, after_id, limit, after_value
+        )
+        yield from iter_query(query, params, batch_size, as_product)
+
+    @cached("products")
+    def count_products(self):
+        query = "SELECT COUNT(*) FROM products"
 
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(query)
+                count = cursor.fetchone()[0]
+
+                return count
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Error: {e}")
+            return None
+
+    def get_products_window(self, offset, limit, after_id=None):
+        """Return one screenful of products, those after product after_id if given"""
+        query = f"SELECT {COLUMNS} FROM products ORDER BY product_id LIMIT ? OFFSET ?"
+
+        try:
+            if after_id is not None:
+                return list(self.iter_products(after_id, limit))
+
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = as_product
+                cursor.execute(query, (limit, offset))
+                products = cursor.fetchall()
+
+                return products
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Error: {e}")
+            return None
+
+    @cached("products")
+    def search(self, term, limit=None):
+        """Return products matching the search text, best matches first"""
+        return self._search(term, limit)
+
+    @cached("products")
+    def search_low_stock(self, term, limit=None):
+        """Return low stock products matching the search text, with their severity"""
+        return self._search(term, limit, f"AND {LOW_STOCK}", LOW_STOCK_COLUMNS)
+
+    def _search(self, term, limit, condition="", columns=COLUMNS):
+        match = fts_query(term)
+        if match is None:
+            return []
+
+        query = f"""
+            SELECT {columns} FROM products_fts
+            JOIN products ON products.product_id = products_fts.rowid
+            WHERE products_fts MATCH ? {condition}
+            ORDER BY rank
+            LIMIT ?
+        """
+
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = as_product
+                cursor.execute(query, (match, -1 if limit is None else limit))
                 products = cursor.fetchall()
 
+                # IDs are not in the text index, so a number can also mean an ID
+                if term.strip().isdigit():
+                    cursor.execute(
+                        f"SELECT {columns} FROM products WHERE products.product_id = ? {condition}",
+                        (int(term),),
+                    )
+                    product = cursor.fetchone()
+                    if product is not None:
+                        products = [product] + [
+                            row
+                            for row in products
+                            if row.product_id != product.product_id
+                        ]
+
                 return products
         except sqlite3.DatabaseError as e:
             logging.error(f"Error: {e}")
             return None
 
+    @cached("products")
+    def get_inventory_value(self):
+        """Return the value of all stock on hand in cents"""
+        query = "SELECT COALESCE(SUM(price_cents * stock), 0) FROM products"
+
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query)
+                value = cursor.fetchone()[0]
+
+                return value
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Error: {e}")
+            return None
+
+    @cached("products", "suppliers")
+    def get_value_by_supplier(self):
+        """Return (supplier_id, company_name, product_count, stock, total_cents) per supplier, most valuable first"""
+        query = """
+            SELECT
+                products.supplier_id,
+                suppliers.company_name,
+                COUNT(*) AS product_count,
+                SUM(products.stock) AS stock,
+                SUM(products.price_cents * products.stock) AS total_cents
+            FROM products
+            LEFT JOIN suppliers ON suppliers.supplier_id = products.supplier_id
+            GROUP BY products.supplier_id
+            ORDER BY total_cents DESC, products.supplier_id
+        """
+
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query)
+                values = cursor.fetchall()
+
+                return values
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Error: {e}")
+            return None
+
+    @cached("products")
+    def get_value_by_product(self, limit=None):
+        """Return products with their stock value, most valuable first"""
+        query = """
+            SELECT
+                product_id,
+                product_name,
+                price_cents,
+                stock,
+                price_cents * stock AS total_cents
+            FROM products
+            ORDER BY total_cents DESC, product_id
+            LIMIT ?
+        """
+
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = as_product
+                cursor.execute(query, (-1 if limit is None else limit,))
+                products = cursor.fetchall()
+
+                return products
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Error: {e}")
+            return None
+
+    @cached("products")
     def get_product_by_id(self, product_id):
         query = "SELECT * FROM products WHERE product_id = ?"
 
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = as_product
                 cursor.execute(query, (product_id,))
                 product = cursor.fetchone()
 
@@ -47,69 +314,280 @@ class Products:
             logging.error(f"Error: {e}")
             return None
 
-    def add_product(self, product_name, price, stock, supplier_name):
-        query = "INSERT INTO products (product_name, supplier_id, price, stock, supplier_name) VALUES (?, ?, ?, ?, ?)"
-        supplier_query = "SELECT supplier_id FROM suppliers WHERE company_name = ?"
-        sales_query = "INSERT INTO sales (product_id, product_sold) VALUES (?, ?)"
+    @invalidates("products")
+    def add_product(self, product_name, price_cents, stock, supplier_name, tx=None):
         try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(supplier_query, (supplier_name,))
-                supplier_result = cursor.fetchone()
-
-                if supplier_result is None:
-                    logging.error(f"No supplier found with name: {supplier_name}")
-                    return False
-
-                supplier_id = supplier_result[0]
-                cursor.execute(
-                    query, (product_name, supplier_id, price, stock, supplier_name)
-                )
-                conn.commit()
-                product_id = cursor.lastrowid
-                cursor.execute(sales_query, (product_id, 0))
-                conn.commit()
-                return True
+            return (tx or writer).run(
+                self._add_product, product_name, price_cents, stock, supplier_name
+            )
         except sqlite3.IntegrityError as f:
             logging.error(f"Error: {f}")
             return False
 
-    def edit_product(self, product_id, product_name, price, stock, supplier_name):
-        query = "UPDATE products SET product_name = ?, price = ?, stock = ?, supplier_name = ? WHERE product_id = ?"
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Error: {e}")
+            return None
+
+    def _add_product(self, conn, product_name, price_cents, stock, supplier_name):
+        query = "INSERT INTO products (product_name, supplier_id, price_cents, stock, supplier_name) VALUES (?, ?, ?, ?, ?)"
+        supplier_query = "SELECT supplier_id FROM suppliers WHERE company_name = ?"
+
+        cursor = conn.cursor()
+        cursor.execute(supplier_query, (supplier_name,))
+        supplier_result = cursor.fetchone()
+
+        if supplier_result is None:
+            logging.error(f"No supplier found with name: {supplier_name}")
+            return False
+
+        supplier_id = supplier_result[0]
+        cursor.execute(
+            query,
+            (product_name, supplier_id, price_cents, stock, supplier_name),
+        )
+        return True
 
+    def import_products_csv(self, path):
+        """Import products from a CSV file, see import_products for the columns"""
         try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    query, (product_name, price, stock, supplier_name, product_id)
-                )
-                conn.commit()
+            with open(path, newline="", encoding="utf-8-sig") as file:
+                # Line 1 is the header
+                return self.import_products(csv.DictReader(file), first_line=2)
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            logging.error(f"Error: {e}")
+            return 0, [(None, str(e))]
+
+    @invalidates("products")
+    def import_products(self, records, first_line=1, tx=None):
+        """Insert many products in a single transaction
+
+        records is an iterable of dicts with product_name, price (e.g.
+        12.50), stock, supplier (the supplier's company name) and optionally
+        reorder_level. Bad records are skipped and reported, the rest are
+        still imported. Returns (imported, errors) where errors is a list of
+        (line, reason).
+        """
+        errors = []
+
+        try:
+            imported = (tx or writer).run(self._import, records, first_line, errors)
 
-                print(cursor.rowcount)
+            errors.sort()
+            return imported, errors
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Error: {e}")
+            return 0, errors + [(None, str(e))]
+
+    def _import(self, conn, records, first_line, errors):
+        imported = 0
+
+        # Resolve supplier names once instead of once per row
+        suppliers = dict(
+            conn.execute("SELECT company_name, supplier_id FROM suppliers")
+        )
+        batch = []
+        for line, record in enumerate(records, first_line):
+            try:
+                batch.append((line, self._import_row(record, suppliers)))
+            except ValueError as e:
+                errors.append((line, str(e)))
+                continue
+
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                imported += self._insert_batch(conn, batch, errors)
+                batch = []
+
+        imported += self._insert_batch(conn, batch, errors)
+        return imported
+
+    def _import_row(self, record, suppliers):
+        product_name = field_text(record, "product_name")
+        supplier_name = field_text(record, "supplier")
+        if not product_name:
+            raise ValueError("Missing product_name")
+
+        if supplier_name not in suppliers:
+            raise ValueError(f"Unknown supplier: {supplier_name}")
+
+        try:
+            price_cents = to_cents(record.get("price"))
+            stock = int(record.get("stock"))
+            # Out of range values would abort the whole import on insert
+            if not (0 <= price_cents <= MAX_INTEGER and 0 <= stock <= MAX_INTEGER):
+                raise ValueError
+        except (TypeError, ValueError):
+            raise ValueError("Invalid price or stock value") from None
 
-                return True
+        reorder_level = field_text(record, "reorder_level")
+        try:
+            reorder_level = (
+                int(reorder_level) if reorder_level else self.DEFAULT_REORDER_LEVEL
+            )
+            if not 0 <= reorder_level <= MAX_INTEGER:
+                raise ValueError
+        except ValueError:
+            raise ValueError("Invalid reorder_level value") from None
+
+        return (
+            product_name,
+            suppliers[supplier_name],
+            price_cents,
+            stock,
+            supplier_name,
+            reorder_level,
+        )
+
+    def _insert_batch(self, conn, batch, errors):
+        """Insert one batch, falling back to row by row to pinpoint bad rows"""
+        query = "INSERT INTO products (product_name, supplier_id, price_cents, stock, supplier_name, reorder_level) VALUES (?, ?, ?, ?, ?, ?)"
+
+        conn.execute("SAVEPOINT import_batch")
+        try:
+            conn.executemany(query, [row for _, row in batch])
+            inserted = len(batch)
+        except sqlite3.IntegrityError:
+            conn.execute("ROLLBACK TO import_batch")
+
+            inserted = 0
+            for line, row in batch:
+                try:
+                    conn.execute(query, row)
+                    inserted += 1
+                except sqlite3.IntegrityError as f:
+                    errors.append((line, str(f)))
+
+        conn.execute("RELEASE import_batch")
+        return inserted
+
+    @invalidates("products")
+    def edit_product(
+        self,
+        product_id,
+        product_name,
+        price_cents,
+        stock,
+        supplier_name,
+        row_version=None,
+        tx=None,
+    ):
+        """Overwrite a product's details
+
+        Pass the row_version the details were based on to only save them if
+        nobody changed the product since; ConflictError is raised otherwise.
+        Returns False when the product is gone or the name is taken, and
+        None when the database stayed locked.
+        """
+        try:
+            return (tx or writer).run(
+                self._edit_product,
+                product_id,
+                product_name,
+                price_cents,
+                stock,
+                supplier_name,
+                row_version,
+            )
         except sqlite3.IntegrityError as f:
             logging.error(f"Error: {f}")
             return False
 
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Error: {e}")
+            return None
+
+    def _edit_product(
+        self,
+        conn,
+        product_id,
+        product_name,
+        price_cents,
+        stock,
+        supplier_name,
+        row_version,
+    ):
+        query = "UPDATE products SET product_name = ?, price_cents = ?, stock = ?, supplier_name = ?, row_version = row_version + 1 WHERE product_id = ? AND row_version = COALESCE(?, row_version)"
+
+        cursor = conn.execute(
+            query,
+            (product_name, price_cents, stock, supplier_name, product_id, row_version),
+        )
+        if cursor.rowcount > 0:
+            return True
+
+        exists = conn.execute(
+            "SELECT 1 FROM products WHERE product_id = ?", (product_id,)
+        ).fetchone()
+        if exists is not None:
+            raise ConflictError(f"Product {product_id} was changed by someone else")
+
+        return False
+
+    @invalidates("products")
+    def set_reorder_level(self, product_id, reorder_level, tx=None):
+        """Set the stock level at which a product needs restocking"""
+        try:
+            return (tx or writer).run(
+                self._set_reorder_level, product_id, reorder_level
+            )
         except sqlite3.DatabaseError as e:
             logging.error(f"Error: {e}")
             return False
 
-    def delete_product(self, product_id):
-        query = "DELETE FROM products WHERE product_id = ?"
-        sales_query = "DELETE FROM sales WHERE product_id = ?"
+    def _set_reorder_level(self, conn, product_id, reorder_level):
+        query = "UPDATE products SET reorder_level = ?, row_version = row_version + 1 WHERE product_id = ?"
+
+        cursor = conn.execute(query, (reorder_level, product_id))
+        return cursor.rowcount > 0
 
+    @invalidates("products")
+    def set_stock(self, product_id, stock, tx=None):
+        """Set a product's stock, e.g. to what a stock count found"""
         try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, (product_id,))
-                conn.commit()
+            return (tx or writer).run(self._set_stock, product_id, stock)
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Error: {e}")
+            return False
+
+    def _set_stock(self, conn, product_id, stock):
+        query = "UPDATE products SET stock = ?, last_updated = CURRENT_TIMESTAMP, row_version = row_version + 1 WHERE product_id = ?"
+
+        cursor = conn.execute(query, (stock, product_id))
+        return cursor.rowcount > 0
 
-                cursor.execute(sales_query, (product_id,))
-                conn.commit()
+    @invalidates("products")
+    def adjust_stock(self, product_id, change, tx=None):
+        """Add change to a product's stock, e.g. a received shipment
 
-                return True
+        Returns False when the product doesn't exist or the change would take
+        its stock below zero.
+        """
+        try:
+            return (tx or writer).run(self._adjust_stock, product_id, change)
         except sqlite3.DatabaseError as e:
             logging.error(f"Error: {e}")
             return False
+
+    def _adjust_stock(self, conn, product_id, change):
+        query = "UPDATE products SET stock = stock + ?, last_updated = CURRENT_TIMESTAMP, row_version = row_version + 1 WHERE product_id = ? AND stock + ? >= 0"
+
+        cursor = conn.execute(query, (change, product_id, change))
+        return cursor.rowcount > 0
+
+    @invalidates("products")
+    def delete_product(self, product_id, tx=None):
+        """Delete a product that has never been sold
+
+        Sales are an append-only ledger, so a product with sales is kept
+        along with its history and False is returned, as for a missing one.
+        """
+        try:
+            return (tx or writer).run(self._delete_product, product_id)
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Error: {e}")
+            return None
+
+    def _delete_product(self, conn, product_id):
+        query = "DELETE FROM products WHERE product_id = ? AND NOT EXISTS (SELECT 1 FROM sales WHERE sales.product_id = products.product_id)"
+
+        cursor = conn.execute(query, (product_id,))
+        return cursor.rowcount > 0
@@ -0,0 +1,87 @@
+class Record:
+    """Base for the compact row types the models return
+
+    Fields are slots, so a record costs a fraction of a dict or sqlite3.Row
+    and reads as an attribute. Queries only select the columns they need,
+    and a field that wasn't selected raises AttributeError instead of
+    silently reading the wrong column.
+    """
+
+    __slots__ = ()
+
+    def __repr__(self):
+        fields = ", ".join(
+            f"{name}={getattr(self, name)!r}"
+            for name in self.__slots__
+            if hasattr(self, name)
+        )
+        return f"{type(self).__name__}({fields})"
+
+    def as_dict(self):
+        """Return the fields that were selected as a dict"""
+        return {
+            name: getattr(self, name)
+            for name in self.__slots__
+            if hasattr(self, name)
+        }
+
+
+class Product(Record):
+    __slots__ = (
+        "product_id",
+        "supplier_id",
+        "product_name",
+        "price_cents",
+        "stock",
+        "supplier_name",
+        "last_updated",
+        "reorder_level",
+        "row_version",
+        "total_cents",
+        "updated_on",
+        "severity",
+    )
+
+
+class Supplier(Record):
+    __slots__ = ("supplier_id", "company_name", "supplier_name", "email", "phone")
+
+
+class SaleLine(Record):
+    __slots__ = (
+        "sale_id",
+        "product_id",
+        "product_name",
+        "quantity",
+        "unit_price_cents",
+        "sale_date",
+        "supplier_name",
+    )
+
+
+class Customer(Record):
+    __slots__ = ("customer_id", "customer_name")
+
+
+def record_factory(record_type):
+    """Return a cursor row_factory that builds record_type instances"""
+    # cursor.description is the same object for every row of a query, so the
+    # field names are only worked out again when the query changes. One
+    # tuple keeps it safe to share between the loader's threads.
+    last = (None, ())
+
+    def factory(cursor, row):
+        nonlocal last
+        description, names = last
+        if cursor.description is not description:
+            description = cursor.description
+            names = tuple(column[0] for column in description)
+            last = (description, names)
+
+        record = record_type.__new__(record_type)
+        for name, value in zip(names, row):
+            setattr(record, name, value)
+
+        return record
+
+    return factory
@@ -1,43 +1,116 @@
 import logging
 import sqlite3
 
-from app.db import get_db_connection
+from app.db import (
+    FETCH_BATCH_SIZE,
+    fts_query,
+    get_db_connection,
+    iter_query,
+    keyset_query,
+)
+from app.models.cache import cached, invalidates, reads
+from app.models.records import SaleLine, record_factory
+from app.writer import writer
+
+# What the sales list shows for each sale
+COLUMNS = "sales.sale_id, products.product_name, sales.quantity, products.supplier_name"
+
+as_sale_line = record_factory(SaleLine)
 
 
 class Sales:
+    # Columns iter_sales can order by
+    ORDER_KEYS = ("sales.sale_id", "sales.sale_date", "products.product_name")
+
+    @cached("products")
     def get_product_id(self, product_name):
+        """Return the ID of the named product, or None"""
         query = "SELECT product_id FROM products WHERE product_name = ?"
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(query, (product_name,))
-                product_id = cursor.fetchone()
+                product = cursor.fetchone()
 
-                return product_id
+                return None if product is None else product["product_id"]
         except sqlite3.DatabaseError as e:
             logging.error(f"Error: {e}")
             return None
 
+    @cached("products")
     def get_all_product_name(self):
+        """Return the name of every product"""
         query = "SELECT product_name FROM products"
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(query)
-                products = cursor.fetchall()
+                products = [row["product_name"] for row in cursor.fetchall()]
 
                 return products
         except sqlite3.DatabaseError as e:
             logging.error(f"Error: {e}")
             return None
 
+    @cached("sales", "products")
     def get_all_sales(self):
-        query = "SELECT sales.sale_id, products.product_name, sales.product_sold, products.supplier_name FROM sales JOIN products ON sales.product_id = products.product_id"
+        try:
+            return list(self.iter_sales())
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Error: {e}")
+            return None
+
+    @reads
+    def iter_sales(
+        self,
+        after_id=None,
+        limit=None,
+        order_by="sales.sale_id",
+        batch_size=FETCH_BATCH_SIZE,
+        after_value=None,
+    ):
+        """Stream sales ordered by order_by, resuming after sale after_id"""
+        if order_by not in self.ORDER_KEYS:
+            raise ValueError(f"Cannot order sales by {order_by}")
+
+        query, params = keyset_query(
+            COLUMNS,
+            "sales JOIN products ON sales.product_id = products.product_id",
+            "sales.sale_id",
+            order_by,
+            after_id,
+            limit,
+            after_value,
+        )
+        yield from iter_query(query, params, batch_size, as_sale_line)
+
+    @cached("sales", "products")
+    def count_sales(self):
+        query = "SELECT COUNT(*) FROM sales JOIN products ON sales.product_id = products.product_id"
 
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(query)
+                count = cursor.fetchone()[0]
+
+                return count
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Error: {e}")
+            return None
+
+    def get_sales_window(self, offset, limit, after_id=None):
+        """Return one screenful of sales, those after sale after_id if given"""
+        query = f"SELECT {COLUMNS} FROM sales JOIN products ON sales.product_id = products.product_id ORDER BY sales.sale_id LIMIT ? OFFSET ?"
+
+        try:
+            if after_id is not None:
+                return list(self.iter_sales(after_id, limit))
+
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = as_sale_line
+                cursor.execute(query, (limit, offset))
                 sales = cursor.fetchall()
 
                 return sales
@@ -45,15 +118,173 @@ class Sales:
             logging.error(f"Error: {e}")
             return None
 
-    def edit_sales(self, sales_id, product_sold):
-        query = "UPDATE sales SET product_sold = ? WHERE sale_id = ?"
+    @cached("sales", "products")
+    def search(self, term, limit=None):
+        """Return sales whose product or supplier matches the search text"""
+        match = fts_query(term)
+        if match is None:
+            return []
+
+        query = f"""
+            SELECT {COLUMNS}
+            FROM products_fts
+            JOIN products ON products.product_id = products_fts.rowid
+            JOIN sales ON sales.product_id = products.product_id
+            WHERE products_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        """
 
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute(query, (product_sold, sales_id))
-                conn.commit()
-                return True
+                cursor.row_factory = as_sale_line
+                cursor.execute(query, (match, -1 if limit is None else limit))
+                sales = cursor.fetchall()
+
+                return sales
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Error: {e}")
+            return None
+
+    @invalidates("products", "sales")
+    def record_sale(self, product_id, quantity, unit_price_cents=None, tx=None):
+        """Append a sale and take its quantity out of stock in one transaction
+
+        unit_price_cents defaults to the product's current price. Returns
+        False when the product doesn't exist or has too little stock left.
+        """
+        try:
+            sale_id = (tx or writer).run(
+                self._record, product_id, quantity, unit_price_cents
+            )
+            return sale_id is not None
         except sqlite3.DatabaseError as e:
             logging.error(f"Error: {e}")
-            return False
+            return None
+
+    @invalidates("products", "sales")
+    def record_sales(self, lines, tx=None):
+        """Record many sales in a single transaction
+
+        lines is an iterable of (product_id, quantity) or
+        (product_id, quantity, unit_price_cents). Lines that would take stock
+        below zero are skipped. Returns the new sale_id of every line, or None
+        for skipped lines.
+        """
+        try:
+            return (tx or writer).run(self._record_lines, lines)
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Error: {e}")
+            return None
+
+    def _record_lines(self, conn, lines):
+        return [self._record(conn, *line) for line in lines]
+
+    def _record(self, conn, product_id, quantity, unit_price_cents=None):
+        stock_query = "UPDATE products SET stock = stock - ?, last_updated = CURRENT_TIMESTAMP, row_version = row_version + 1 WHERE product_id = ? AND stock >= ?"
+        sale_query = "INSERT INTO sales (product_id, quantity, unit_price_cents, sale_day) SELECT product_id, ?, COALESCE(?, price_cents), date('now', 'localtime') FROM products WHERE product_id = ?"
+
+        if quantity <= 0:
+            logging.error(f"Invalid quantity {quantity} for product {product_id}")
+            return None
+
+        # The stock >= ? guard makes the decrement and the check one statement,
+        # so two terminals selling the last item can't both succeed
+        cursor = conn.execute(stock_query, (quantity, product_id, quantity))
+        if cursor.rowcount == 0:
+            logging.error(f"Not enough stock for product {product_id}")
+            return None
+
+        # sale_day is the local day here and now, stored so the rollups bucket
+        # the sale the same whichever time zone later reads or deletes it
+        cursor = conn.execute(sale_query, (quantity, unit_price_cents, product_id))
+        return cursor.lastrowid
+
+    @cached("sales", "products")
+    def get_daily_sales(self, start, end, product_id=None):
+        """Return per product daily totals for days start to end inclusive
+
+        Rows are (sale_day, product_id, product_name, quantity, revenue_cents,
+        sale_count). Days are local dates, given as YYYY-MM-DD strings or date
+        objects.
+        """
+        query = """
+            SELECT sales_daily.sale_day, sales_daily.product_id, products.product_name,
+                sales_daily.quantity, sales_daily.revenue_cents, sales_daily.sale_count
+            FROM sales_daily
+            JOIN products ON products.product_id = sales_daily.product_id
+            WHERE sales_daily.sale_day BETWEEN ? AND ?
+        """
+        params = [str(start), str(end)]
+        if product_id is not None:
+            query += " AND sales_daily.product_id = ?"
+            params.append(product_id)
+        query += " ORDER BY sales_daily.sale_day, sales_daily.product_id"
+
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                sales = cursor.fetchall()
+
+                return sales
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Error: {e}")
+            return None
+
+    @cached("sales", "suppliers")
+    def get_weekly_supplier_sales(self, start, end, supplier_id=None):
+        """Return per supplier weekly totals for weeks starting start to end
+
+        Weeks start on Monday. Rows are (week_start, supplier_id,
+        company_name, quantity, revenue_cents, sale_count).
+        """
+        query = """
+            SELECT weekly.week_start, weekly.supplier_id, suppliers.company_name,
+                weekly.quantity, weekly.revenue_cents, weekly.sale_count
+            FROM supplier_sales_weekly AS weekly
+            LEFT JOIN suppliers ON suppliers.supplier_id = weekly.supplier_id
+            WHERE weekly.week_start BETWEEN date(?, 'weekday 0', '-6 days') AND ?
+        """
+        params = [str(start), str(end)]
+        if supplier_id is not None:
+            query += " AND weekly.supplier_id = ?"
+            params.append(supplier_id)
+        query += " ORDER BY weekly.week_start, weekly.supplier_id"
+
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                sales = cursor.fetchall()
+
+                return sales
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Error: {e}")
+            return None
+
+    @cached("sales", "products")
+    def get_product_sales_totals(self, start, end):
+        """Return (product_id, product_name, quantity, revenue_cents) per product for days start to end, best sellers first"""
+        query = """
+            SELECT sales_daily.product_id, products.product_name,
+                SUM(sales_daily.quantity) AS quantity,
+                SUM(sales_daily.revenue_cents) AS revenue_cents
+            FROM sales_daily
+            JOIN products ON products.product_id = sales_daily.product_id
+            WHERE sales_daily.sale_day BETWEEN ? AND ?
+            GROUP BY sales_daily.product_id
+            ORDER BY quantity DESC, sales_daily.product_id
+        """
+
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, (str(start), str(end)))
+                totals = cursor.fetchall()
+
+                return totals
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Error: {e}")
+            return None
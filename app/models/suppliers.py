@@ -1,16 +1,44 @@
+import csv
+import json
 import logging
 import sqlite3
 
-from app.db import get_db_connection
+from app.db import (
+    FETCH_BATCH_SIZE,
+    IMPORT_BATCH_SIZE,
+    fts_query,
+    get_db_connection,
+    iter_query,
+    keyset_query,
+)
+from app.models.cache import cached, invalidates, reads
+from app.models.records import Supplier, record_factory
+from app.writer import writer
+
+COLUMNS = "suppliers.supplier_id, suppliers.company_name, suppliers.supplier_name, suppliers.email, suppliers.phone"
+
+as_supplier = record_factory(Supplier)
+
+
+def is_valid_contact(email, phone):
+    """Check an email and an 11 digit 09XXXXXXXXX mobile number"""
+    valid_email = "@" in email and "." in email
+    valid_phone = phone.isdigit() and len(phone) == 11 and phone.startswith("09")
+    return valid_email and valid_phone
 
 
 class Suppliers:
+    # Columns iter_suppliers can order by
+    ORDER_KEYS = ("supplier_id", "company_name", "supplier_name")
+
+    @cached("suppliers")
     def get_all_supplier_names(self):
         query = "SELECT supplier_name FROM suppliers"
 
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = as_supplier
                 cursor.execute(query)
                 supplier_names = cursor.fetchall()
 
@@ -19,13 +47,86 @@ class Suppliers:
             logging.error("Database error: %s", e)
             return None
 
+    @cached("suppliers")
     def get_all_suppliers(self):
-        query = "SELECT * FROM suppliers"
+        try:
+            return list(self.iter_suppliers())
+        except sqlite3.DatabaseError as e:
+            logging.error("Database error: %s", e)
+            return None
+
+    @reads
+    def iter_suppliers(
+        self,
+        after_id=None,
+        limit=None,
+        order_by="supplier_id",
+        batch_size=FETCH_BATCH_SIZE,
+        after_value=None,
+    ):
+        """Stream suppliers ordered by order_by, resuming after supplier after_id"""
+        if order_by not in self.ORDER_KEYS:
+            raise ValueError(f"Cannot order suppliers by {order_by}")
+
+        query, params = keyset_query(
+            COLUMNS, "suppliers", "supplier_id", order_by, after_id, limit, after_value
+        )
+        yield from iter_query(query, params, batch_size, as_supplier)
+
+    @cached("suppliers")
+    def search(self, term, limit=None):
+        """Return suppliers matching the search text, best matches first"""
+        match = fts_query(term)
+        if match is None:
+            return []
+
+        query = f"""
+            SELECT {COLUMNS} FROM suppliers_fts
+            JOIN suppliers ON suppliers.supplier_id = suppliers_fts.rowid
+            WHERE suppliers_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        """
+
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = as_supplier
+                cursor.execute(query, (match, -1 if limit is None else limit))
+                suppliers = cursor.fetchall()
+
+                return suppliers
+        except sqlite3.DatabaseError as e:
+            logging.error("Database error: %s", e)
+            return None
+
+    @cached("suppliers")
+    def count_suppliers(self):
+        query = "SELECT COUNT(*) FROM suppliers"
 
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(query)
+                count = cursor.fetchone()[0]
+
+                return count
+        except sqlite3.DatabaseError as e:
+            logging.error("Database error: %s", e)
+            return None
+
+    def get_suppliers_window(self, offset, limit, after_id=None):
+        """Return one screenful of suppliers, those after supplier after_id if given"""
+        query = f"SELECT {COLUMNS} FROM suppliers ORDER BY supplier_id LIMIT ? OFFSET ?"
+
+        try:
+            if after_id is not None:
+                return list(self.iter_suppliers(after_id, limit))
+
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = as_supplier
+                cursor.execute(query, (limit, offset))
                 suppliers = cursor.fetchall()
 
                 return suppliers
@@ -33,12 +134,14 @@ class Suppliers:
             logging.error("Database error: %s", e)
             return None
 
+    @cached("suppliers")
     def get_supplier_by_id(self, supplier_id):
-        query = "SELECT * FROM suppliers WHERE id = ?"
+        query = f"SELECT {COLUMNS} FROM suppliers WHERE supplier_id = ?"
 
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = as_supplier
                 cursor.execute(query, (supplier_id,))
                 supplier = cursor.fetchone()
 
@@ -47,54 +150,165 @@ class Suppliers:
             logging.error("Database error: %s", e)
             return None
 
-    def add_supplier(self, company_name, supplier_name, email, phone):
-        query = "INSERT INTO suppliers (company_name, supplier_name, email, phone) VALUES (?, ?, ?, ?)"
-
+    @invalidates("suppliers")
+    def add_supplier(self, company_name, supplier_name, email, phone, tx=None):
         try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, (company_name, supplier_name, email, phone))
-                conn.commit()
-
-                return True
+            return (tx or writer).run(
+                self._add_supplier, company_name, supplier_name, email, phone
+            )
         except sqlite3.IntegrityError as f:
             logging.error("Integrity error: %s", f)
             return False
 
         except sqlite3.DatabaseError as e:
             logging.error("Database error: %s", e)
-            return False
+            return None
 
-    def edit_supplier(self, supplier_id, company_name, supplier_name, email, phone):
-        query = "UPDATE suppliers SET company_name = ?, supplier_name = ?, email = ?, phone = ? WHERE supplier_id = ?"
+    def _add_supplier(self, conn, company_name, supplier_name, email, phone):
+        query = "INSERT INTO suppliers (company_name, supplier_name, email, phone) VALUES (?, ?, ?, ?)"
 
+        conn.execute(query, (company_name, supplier_name, email, phone))
+        return True
+
+    def upsert_suppliers_csv(self, path):
+        """Upsert suppliers from a CSV file, see upsert_suppliers for the columns"""
         try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    query, (company_name, supplier_name, email, phone, supplier_id)
-                )
-                conn.commit()
+            with open(path, newline="", encoding="utf-8-sig") as file:
+                # Line 1 is the header
+                return self.upsert_suppliers(csv.DictReader(file), first_line=2)
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            logging.error("Import error: %s", e)
+            return [(None, "rejected", str(e))]
+
+    @invalidates("suppliers")
+    def upsert_suppliers(self, records, first_line=1, tx=None):
+        """Insert new suppliers and update existing ones in one transaction
+
+        records is an iterable of dicts with company_name, supplier_name,
+        email and phone. company_name identifies the supplier. Returns a
+        report with one (line, status, reason) per record, where status is
+        "inserted", "updated" or "rejected" and reason explains rejections.
+        """
+        report = []
+
+        try:
+            (tx or writer).run(self._upsert, records, first_line, report)
+
+            report.sort(key=lambda entry: entry[0])
+            return report
+        except sqlite3.DatabaseError as e:
+            logging.error("Database error: %s", e)
+            return report + [(None, "rejected", str(e))]
+
+    def _upsert(self, conn, records, first_line, report):
+        seen = set()
+        batch = []
+        for line, record in enumerate(records, first_line):
+            row = tuple(
+                str(record.get(field) or "").strip()
+                for field in ("company_name", "supplier_name", "email", "phone")
+            )
+
+            if not all(row):
+                report.append((line, "rejected", "Missing field"))
+            elif not is_valid_contact(row[2], row[3]):
+                report.append((line, "rejected", "Invalid email or phone"))
+            else:
+                batch.append((line, row))
+
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                self._upsert_batch(conn, batch, seen, report)
+                batch = []
+
+        self._upsert_batch(conn, batch, seen, report)
+
+    def _upsert_batch(self, conn, batch, seen, report):
+        """Upsert one batch, falling back to row by row to pinpoint bad rows"""
+        query = """
+            INSERT INTO suppliers (company_name, supplier_name, email, phone)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (company_name) DO UPDATE SET
+                supplier_name = excluded.supplier_name,
+                email = excluded.email,
+                phone = excluded.phone
+        """
+        if not batch:
+            return
+
+        # Which companies exist decides inserted vs updated in the report
+        names = json.dumps([row[0] for _, row in batch])
+        existing = {
+            name
+            for (name,) in conn.execute(
+                "SELECT company_name FROM suppliers WHERE company_name IN (SELECT value FROM json_each(?))",
+                (names,),
+            )
+        }
+
+        def status(company_name):
+            if company_name in existing or company_name in seen:
+                return "updated"
+            seen.add(company_name)
+            return "inserted"
 
-                return True
+        conn.execute("SAVEPOINT upsert_batch")
+        try:
+            conn.executemany(query, [row for _, row in batch])
+            report.extend((line, status(row[0]), None) for line, row in batch)
+        except sqlite3.IntegrityError:
+            # Another supplier already uses this email or phone
+            conn.execute("ROLLBACK TO upsert_batch")
+
+            for line, row in batch:
+                try:
+                    conn.execute(query, row)
+                    report.append((line, status(row[0]), None))
+                except sqlite3.IntegrityError as f:
+                    report.append((line, "rejected", str(f)))
+
+        conn.execute("RELEASE upsert_batch")
+
+    @invalidates("suppliers")
+    def edit_supplier(
+        self, supplier_id, company_name, supplier_name, email, phone, tx=None
+    ):
+        try:
+            return (tx or writer).run(
+                self._edit_supplier,
+                supplier_id,
+                company_name,
+                supplier_name,
+                email,
+                phone,
+            )
         except sqlite3.IntegrityError as f:
             logging.error("Integrity error: %s", f)
             return False
 
         except sqlite3.DatabaseError as e:
             logging.error("Database error: %s", e)
-            return False
+            return None
 
-    def delete_supplier(self, supplier_id):
-        query = "DELETE FROM suppliers WHERE supplier_id = ?"
+    def _edit_supplier(
+        self, conn, supplier_id, company_name, supplier_name, email, phone
+    ):
+        query = "UPDATE suppliers SET company_name = ?, supplier_name = ?, email = ?, phone = ? WHERE supplier_id = ?"
 
-        try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, (supplier_id,))
-                conn.commit()
+        cursor = conn.execute(
+            query, (company_name, supplier_name, email, phone, supplier_id)
+        )
+        return cursor.rowcount > 0
 
-                return True
+    @invalidates("suppliers")
+    def delete_supplier(self, supplier_id, tx=None):
+        try:
+            return (tx or writer).run(self._delete_supplier, supplier_id)
         except sqlite3.DatabaseError as e:
             logging.error("Database error: %s", e)
-            return False
+            return None
+
+    def _delete_supplier(self, conn, supplier_id):
+        query = "DELETE FROM suppliers WHERE supplier_id = ?"
+
+        cursor = conn.execute(query, (supplier_id,))
+        return cursor.rowcount > 0
@@ -0,0 +1,21 @@
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from functools import lru_cache
+
+CURRENCY = "₱"
+
+
+def to_cents(amount):
+    """Turn an amount such as "12.5", "₱12.50" or 12.5 into integer cents"""
+    try:
+        value = Decimal(str(amount).strip().replace(CURRENCY, ""))
+        return int((value * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"Invalid amount: {amount}") from None
+
+
+@lru_cache(maxsize=4096)
+def format_money(cents, currency=CURRENCY):
+    """Format integer cents for display, e.g. 123450 -> ₱1234.50"""
+    sign = "-" if cents < 0 else ""
+    whole, fraction = divmod(abs(cents), 100)
+    return f"{sign}{currency}{whole}.{fraction:02d}"
@@ -30,4 +30,5 @@ CREATE TABLE IF NOT EXISTS customers(
     customer_name TEXT NOT NULL
 );
 
--- Perf?
+-- Indexes and later schema changes live in app/migrations and are applied
+-- by init_db() on top of this baseline.
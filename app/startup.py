@@ -0,0 +1,44 @@
+import os
+import time
+
+# Set INVENTORY_PROFILE_STARTUP=1 to print where startup time goes
+ENABLED = os.environ.get("INVENTORY_PROFILE_STARTUP") == "1"
+
+_start = time.perf_counter()
+_last = _start
+_marks = []
+
+
+def mark(label):
+    """Record the time spent since the previous mark under label"""
+    global _last
+
+    if not ENABLED:
+        return
+
+    now = time.perf_counter()
+    _marks.append((label, now - _last))
+    _last = now
+
+
+def report_after_first_paint(window):
+    """Print the startup breakdown once the window has been drawn"""
+    if not ENABLED:
+        return
+
+    def first_paint():
+        # Flush the pending redraws so the first paint is really done
+        window.update_idletasks()
+        mark("first paint")
+        report()
+
+    window.after(0, first_paint)
+
+
+def report():
+    """Print every mark and the total since this module was imported"""
+    width = max(len(label) for label, _ in _marks)
+    print("Startup profile:")
+    for label, seconds in _marks:
+        print(f"  {label:<{width}}  {seconds * 1000:8.1f} ms")
+    print(f"  {'total':<{width}}  {(_last - _start) * 1000:8.1f} ms")
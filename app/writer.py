@@ -0,0 +1,334 @@
+import atexit
+import itertools
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from app.db import close_db_connection, get_db_connection, retry_busy
+
+# How long the writer waits for more writes to share a commit with, and the
+# most writes one commit takes
+GROUP_COMMIT_WINDOW = 0.002
+GROUP_COMMIT_LIMIT = 100
+
+
+class WriterConnection(sqlite3.Connection):
+    """The writer's connection, whose transactions only the writer ends
+
+    Model reads routed here from a unit of work use `with conn:` like every
+    other read, which would otherwise commit the unit of work half way.
+    """
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class Writer:
+    """The one thread that writes to the database
+
+    Writes are queued as operations, functions called with the writer's
+    connection as their first argument, and callers get a Future for the
+    result. Operations queued within a short window share one transaction
+    and one commit, each under its own SAVEPOINT so a failing operation is
+    rolled back alone while the others still commit. Futures resolve once
+    the commit is done.
+
+    With a single writer, threads in this process never contend for
+    SQLite's write lock, and a burst of sales costs one fsync instead of one
+    per sale.
+    """
+
+    def __init__(self, window=GROUP_COMMIT_WINDOW, limit=GROUP_COMMIT_LIMIT):
+        self.window = window
+        self.limit = limit
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+        self.local = threading.local()  # the calling thread's open Transaction
+
+    def submit(self, func, *args):
+        """Queue func(conn, *args) and return a Future for its result"""
+        future = Future()
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self._run, name="db-writer", daemon=True
+                )
+                self.thread.start()
+
+            self.queue.put((future, func, args))
+
+        return future
+
+    def run(self, func, *args):
+        """Perform func(conn, *args) and return its result once committed"""
+        # An operation that itself writes is already inside the transaction
+        if threading.current_thread() is self.thread:
+            return func(get_db_connection(), *args)
+
+        # Inside a unit of work the write joins it instead of waiting for a
+        # writer that is busy serving that very unit of work
+        tx = self.current_transaction()
+        if tx is not None:
+            return tx.run(func, *args)
+
+        return self.submit(func, *args).result()
+
+    def transaction(self):
+        """Start a unit of work, or a savepoint when one is already open"""
+        tx = self.current_transaction()
+        if tx is not None:
+            return tx.savepoint()
+
+        return Transaction(self)
+
+    def current_transaction(self):
+        """Return the calling thread's open unit of work, if any"""
+        return getattr(self.local, "transaction", None)
+
+    def stop(self):
+        """Finish the queued writes and end the writer thread"""
+        with self.lock:
+            thread = self.thread
+            if thread is None:
+                return
+
+            self.queue.put(None)
+            self.thread = None
+
+        thread.join()
+
+    def _run(self):
+        conn = get_db_connection(WriterConnection)
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    return
+
+                if batch:
+                    self._commit(conn, batch)
+        finally:
+            close_db_connection()
+
+    def _next_batch(self):
+        """Wait for a write, then take whatever else arrives within the window"""
+        item = self.queue.get()
+        if item is None:
+            return None
+
+        batch = [item]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.limit:
+            try:
+                item = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+
+            if item is None:
+                # Stop after this batch
+                self.queue.put(None)
+                break
+
+            batch.append(item)
+
+        return [
+            (future, func, args)
+            for future, func, args in batch
+            if future.set_running_or_notify_cancel()
+        ]
+
+    def _commit(self, conn, batch):
+        outcomes = []
+        try:
+            # Only taking the lock and committing wait on other terminals,
+            # and both are safe to repeat
+            retry_busy(conn.execute, "BEGIN IMMEDIATE")
+
+            for future, func, args in batch:
+                conn.execute("SAVEPOINT write_operation")
+                try:
+                    result = func(conn, *args)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write_operation")
+                    conn.execute("RELEASE write_operation")
+                    outcomes.append((future, None, e))
+                else:
+                    conn.execute("RELEASE write_operation")
+                    outcomes.append((future, result, None))
+
+            retry_busy(conn.commit)
+        except sqlite3.DatabaseError as e:
+            logging.error(f"Error: {e}")
+            if conn.in_transaction:
+                conn.rollback()
+
+            for future, _, _ in batch:
+                future.set_exception(e)
+            return
+
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+class Rollback(Exception):
+    """Raised on the writer thread to undo a unit of work"""
+
+
+class Transaction:
+    """Several writes that commit together as one unit of work
+
+    Entering the block queues one writer operation that stays open and runs
+    the writes handed to it by run(), each under its own SAVEPOINT. Leaving
+    the block commits them all at once, or rolls them all back if the block
+    raised. savepoint() nests a part that can be undone on its own.
+
+    Model reads inside the block run within it on the writer's connection,
+    so they see the block's writes, and are not cached. If the writer
+    operation fails or ends early, e.g. because another terminal kept the
+    database locked, writes still waiting and any made later in the block
+    raise its error instead of waiting forever.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.requests = queue.Queue()
+        self.future = None
+        self.savepoints = itertools.count()
+        self.callbacks = []
+        self.rolled_back = False
+        self.lock = threading.Lock()
+        self.error = None  # why the unit of work ended, once it has
+        self.current = None  # the request being served
+
+    def __enter__(self):
+        self.future = self.writer.submit(self._serve)
+        self.future.add_done_callback(self._finished)
+        self.writer.local.transaction = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.writer.local.transaction = None
+        if exc_type is None and not self.rolled_back:
+            self.requests.put(None)
+        else:
+            self.requests.put(Rollback())
+
+        try:
+            self.future.result()
+        except Rollback:
+            pass
+        except Exception:
+            # Don't hide the exception that ended the block
+            if exc_type is None:
+                raise
+        finally:
+            for func, args in self.callbacks:
+                func(*args)
+
+        return False
+
+    def run(self, func, *args):
+        """Perform func(conn, *args) within the unit of work and return its result"""
+        return self._request(func, args, True)
+
+    def rollback(self):
+        """Undo every write of the unit of work when the block ends"""
+        self.rolled_back = True
+
+    def call_after(self, func, *args):
+        """Call func(*args) once the unit of work has committed or rolled back"""
+        self.callbacks.append((func, args))
+
+    @contextmanager
+    def savepoint(self):
+        """Nest a part of the unit of work that rolls back alone if it raises"""
+        name = f"unit_of_work_{next(self.savepoints)}"
+
+        self._request(_execute, (f"SAVEPOINT {name}",), False)
+        try:
+            yield self
+        except BaseException:
+            self._request(_execute, (f"ROLLBACK TO {name}",), False)
+            self._request(_execute, (f"RELEASE {name}",), False)
+            raise
+
+        self._request(_execute, (f"RELEASE {name}",), False)
+
+    def _request(self, func, args, atomic):
+        if threading.current_thread() is self.writer.thread:
+            return func(get_db_connection(), *args)
+
+        future = Future()
+        future.set_running_or_notify_cancel()
+        with self.lock:
+            if self.error is not None:
+                raise self.error
+
+            self.requests.put((future, func, args, atomic))
+
+        return future.result()
+
+    def _finished(self, future):
+        """Fail the requests nobody will serve once the writer operation ended"""
+        error = future.exception() or RuntimeError("The unit of work has ended")
+
+        with self.lock:
+            self.error = error
+            waiting = [self.current]
+            while True:
+                try:
+                    request = self.requests.get_nowait()
+                except queue.Empty:
+                    break
+
+                if isinstance(request, tuple):
+                    waiting.append(request[0])
+
+        for request_future in waiting:
+            if request_future is not None and not request_future.done():
+                request_future.set_exception(error)
+
+    def _serve(self, conn):
+        """The writer operation that runs the unit of work"""
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+            if isinstance(request, Rollback):
+                raise request
+
+            future, func, args, atomic = request
+            self.current = future
+            if atomic:
+                conn.execute("SAVEPOINT unit_of_work_operation")
+            try:
+                result = func(conn, *args)
+            except Exception as e:
+                if atomic:
+                    conn.execute("ROLLBACK TO unit_of_work_operation")
+                    conn.execute("RELEASE unit_of_work_operation")
+                future.set_exception(e)
+            else:
+                if atomic:
+                    conn.execute("RELEASE unit_of_work_operation")
+                future.set_result(result)
+
+            self.current = None
+
+
+def _execute(conn, statement):
+    conn.execute(statement)
+
+
+# Every model write goes through this one
+writer = Writer()
+
+atexit.register(writer.stop)
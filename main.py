@@ -1,9 +1,14 @@
+from app import startup
 from app.app import (
     AppRight,
 )  # Change this to AppLeft, AppRight, or AppTop for navigation
 from app.db import init_db
 
+startup.mark("import")
+
 if __name__ == "__main__":
     init_db()
+    startup.mark("database")
     app = AppRight()  # Change this to AppLeft, AppRight, or AppTop for navigation
+    startup.report_after_first_paint(app)
     app.mainloop()
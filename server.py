@@ -0,0 +1,18 @@
+import argparse
+import logging
+
+from app.api import WORKERS, serve
+from app.db import init_db
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the inventory as a JSON API")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on")
+    parser.add_argument(
+        "--workers", type=int, default=WORKERS, help="requests served at once"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    serve(args.host, args.port, args.workers)